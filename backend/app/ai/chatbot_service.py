@@ -0,0 +1,350 @@
+"""
+Health Chatbot
+--------------
+Generates chatbot replies token by token from a pluggable backend:
+
+- `StubBackend`: deterministic canned answers, streamed word by word;
+  the default, and what tests run against
+- `LocalModelBackend`: a local CPU model through `llama-cpp-python`
+  (optional dependency), generated in a worker thread and handed to the
+  event loop one token at a time
+
+`ChatService` sits in front of the backend:
+
+- at most `max_concurrency` generations run at once; up to `max_queue`
+  more wait for a slot (for at most `queue_timeout` seconds) and
+  anything beyond that is refused with `ChatbotBusy`
+- single-turn prompts are FAQ-style and often repeated, so their full
+  answers are cached (LRU + TTL) under a normalised prompt key and
+  replayed without touching the backend
+"""
+
+import abc
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a health assistant for a personal health records app. Give "
+    "short, general health information in plain language. You do not "
+    "diagnose; advise seeing a doctor for anything serious or persistent."
+)
+
+DISCLAIMER = "This is general information, not a diagnosis. Please consult a doctor if you are concerned."
+
+
+class ChatbotBusy(Exception):
+    pass
+
+
+def _tokens(text: str) -> List[str]:
+    """Split into word tokens that keep their trailing whitespace."""
+    return re.findall(r"\S+\s*", text)
+
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+class ChatBackend(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, messages: List[Dict[str, str]], max_tokens: int) -> AsyncIterator[str]:
+        ...
+
+
+class StubBackend(ChatBackend):
+    """Keyword-matched canned answers; same input, same tokens."""
+
+    name = "stub"
+
+    ANSWERS = {
+        ("fever", "temperature"): (
+            "For a mild fever, rest, drink plenty of fluids and take paracetamol "
+            "if needed. See a doctor if it is above 39.4 C, lasts more than three "
+            "days, or comes with a stiff neck, rash or trouble breathing."
+        ),
+        ("headache", "migraine"): (
+            "Most headaches ease with rest, water and a simple painkiller. Seek "
+            "care urgently for a sudden severe headache, or one with confusion, "
+            "weakness or vision changes."
+        ),
+        ("blood pressure", "hypertension", "bp"): (
+            "A normal resting blood pressure is below 120/80 mmHg. Less salt, "
+            "regular exercise and taking prescribed medicines consistently all "
+            "help keep it in range."
+        ),
+        ("sugar", "glucose", "diabetes"): (
+            "Fasting blood glucose is usually 70 to 100 mg/dL. Log your readings "
+            "regularly and share the trend with your doctor, especially if you see "
+            "repeated values above 180 or below 70."
+        ),
+        ("sleep", "insomnia"): (
+            "Adults usually need 7 to 9 hours of sleep. A regular bedtime, less "
+            "screen time before bed and avoiding late caffeine help most people."
+        ),
+        ("medicine", "medication", "dose", "missed"): (
+            "If you miss a dose, take it when you remember unless it is nearly time "
+            "for the next one; never double up. Your prescription reminders can "
+            "help you stay on schedule."
+        ),
+    }
+
+    FALLBACK = (
+        "I can share general information about symptoms, vitals, medicines and "
+        "healthy habits. Could you tell me a bit more about what you would like "
+        "to know?"
+    )
+
+    def __init__(self, token_delay: float = 0.0):
+        self.token_delay = token_delay
+
+    def answer(self, prompt: str) -> str:
+        text = prompt.lower()
+        for keywords, answer in self.ANSWERS.items():
+            if any(re.search(rf"\b{re.escape(k)}\b", text) for k in keywords):
+                return f"{answer} {DISCLAIMER}"
+        return self.FALLBACK
+
+    async def generate(self, messages, max_tokens):
+        for token in _tokens(self.answer(messages[-1]["content"]))[:max_tokens]:
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+
+class LocalModelBackend(ChatBackend):
+    """
+    GGUF model run on the CPU with llama-cpp-python. The model is not
+    thread-safe, so generations are serialised on a lock; size the chat
+    service's concurrency to the number of model instances (1).
+    """
+
+    name = "local"
+
+    def __init__(self, model_path: str, context_tokens: int, threads: int):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise RuntimeError(
+                "CHATBOT_BACKEND=local requires the llama-cpp-python package"
+            )
+        self._llm = Llama(
+            model_path=model_path,
+            n_ctx=context_tokens,
+            n_threads=threads,
+            verbose=False,
+        )
+        self._lock = threading.Lock()
+
+    def _run(self, messages, max_tokens, loop, queue: asyncio.Queue, cancelled: threading.Event):
+        try:
+            with self._lock:
+                chunks = self._llm.create_chat_completion(
+                    messages=messages, max_tokens=max_tokens, stream=True
+                )
+                for chunk in chunks:
+                    if cancelled.is_set():
+                        break
+                    token = chunk["choices"][0]["delta"].get("content")
+                    if token:
+                        loop.call_soon_threadsafe(queue.put_nowait, token)
+        except Exception as exc:
+            loop.call_soon_threadsafe(queue.put_nowait, exc)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def generate(self, messages, max_tokens):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        worker = loop.run_in_executor(
+            None, self._run, messages, max_tokens, loop, queue, cancelled
+        )
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Client went away or generation finished: stop the thread
+            cancelled.set()
+            await asyncio.shield(worker)
+
+
+def build_backend() -> ChatBackend:
+    if settings.CHATBOT_BACKEND == "local":
+        return LocalModelBackend(
+            settings.CHATBOT_MODEL_PATH,
+            settings.CHATBOT_CONTEXT_TOKENS,
+            settings.CHATBOT_THREADS,
+        )
+    return StubBackend(settings.CHATBOT_STUB_TOKEN_DELAY_SECONDS)
+
+
+# --------------------------------------------------
+# FAQ Answer Cache
+# --------------------------------------------------
+class AnswerCache:
+    """LRU of complete answers to single-turn prompts, with a TTL."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return " ".join(re.sub(r"[^\w\s]", " ", prompt.lower()).split())
+
+    def get(self, prompt: str) -> Optional[str]:
+        key = self.key(prompt)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, prompt: str, answer: str):
+        if self.max_size <= 0:
+            return
+        key = self.key(prompt)
+        self._entries[key] = (time.monotonic() + self.ttl, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# --------------------------------------------------
+# Chat Service
+# --------------------------------------------------
+class ChatService:
+    def __init__(
+        self,
+        backend: ChatBackend,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_tokens: int,
+        cache: AnswerCache,
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_tokens = max_tokens
+        self.cache = cache
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.active = 0
+
+        self.generated = 0
+        self.rejected = 0
+        self.first_tokens = 0
+        self.first_token_total = 0.0
+
+    def has_capacity(self) -> bool:
+        return self.waiting < self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one generation slot; raises ChatbotBusy if the queue is full or too slow."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if not self._semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise ChatbotBusy()
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise ChatbotBusy()
+            finally:
+                self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def cached_answer(self, message: str, history: List[Dict[str, str]]) -> Optional[str]:
+        return None if history else self.cache.get(message)
+
+    def replay(self, answer: str) -> List[str]:
+        return _tokens(answer)
+
+    async def stream(self, message: str, history: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Tokens of a fresh answer; the complete answer is cached if cacheable."""
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history,
+                    {"role": "user", "content": message}]
+
+        async with self.slot():
+            started = time.perf_counter()
+            parts = []
+            async for token in self.backend.generate(messages, self.max_tokens):
+                if not parts:
+                    self.first_tokens += 1
+                    self.first_token_total += time.perf_counter() - started
+                parts.append(token)
+                yield token
+
+        self.generated += 1
+        if not history:
+            self.cache.put(message, "".join(parts))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "active": self.active,
+            "waiting": self.waiting,
+            "generated": self.generated,
+            "rejected": self.rejected,
+            "avg_first_token_ms": round(
+                1000 * self.first_token_total / self.first_tokens, 2
+            ) if self.first_tokens else None,
+            "cache": self.cache.stats(),
+        }
+
+
+chat_service = ChatService(
+    backend=build_backend(),
+    max_concurrency=settings.CHATBOT_MAX_CONCURRENCY,
+    max_queue=settings.CHATBOT_MAX_QUEUE,
+    queue_timeout=settings.CHATBOT_QUEUE_TIMEOUT_SECONDS,
+    max_tokens=settings.CHATBOT_MAX_TOKENS,
+    cache=AnswerCache(settings.CHATBOT_CACHE_SIZE, settings.CHATBOT_CACHE_TTL_SECONDS),
+)
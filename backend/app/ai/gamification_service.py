@@ -0,0 +1,376 @@
+"""
+Gamification Points
+-------------------
+Two collections:
+
+- `task_history`: append-only ledger, one document per award
+  (`TaskHistory` fields plus a unique `award_key`)
+- `points_wallets`: one document per patient holding the running
+  `total_points`, maintained with upserted `$inc`
+
+Awarding points is one ledger insert, one wallet `$inc` and one write
+flagging the ledger entry as applied; reading a balance is a single wallet lookup and never sums history. The unique
+`award_key` (e.g. `log_vitals:<patient>:<day>`) makes awards idempotent:
+a duplicate insert is rejected and the wallet is left alone, so retries
+and re-runs of the nightly job cannot double-count.
+
+The writes are not atomic (a multi-document transaction would need a
+replica set), so each is made safe to repeat:
+
+- ledger entries are inserted with `wallet_applied: false` and flagged
+  once their wallet `$inc` has landed
+- the wallet `$inc` only matches a wallet whose `recent_award_keys`
+  does not contain the award key yet, and pushes it (bounded list)
+
+A retried award whose ledger entry is still unapplied re-runs the wallet
+write instead of reporting a duplicate, and `run_repairs` periodically
+applies entries left behind by a crash. `reconcile_wallets` rebuilds
+every total from the ledger as a last resort.
+
+The bulk path pre-aggregates awards per patient and writes them with one
+`insert_many(ordered=False)` and one `bulk_write` of wallet upserts. A
+patient whose wallet already holds one of the keys falls back to
+`award` per entry, so the other keys still land.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LEDGER_COLLECTION = "task_history"
+WALLETS_COLLECTION = "points_wallets"
+
+DUPLICATE_KEY = 11000
+STREAK_TASK = "daily_streak"
+# Award keys remembered per wallet to make the wallet $inc idempotent
+RECENT_AWARD_KEYS = 200
+
+# Points per completed task; each can be awarded once per patient per day
+TASK_POINTS: Dict[str, int] = {
+    "log_vitals": 10,
+    "take_medication": 5,
+    "symptom_check": 5,
+    "daily_walk": 15,
+    "hydration_goal": 5,
+    "sleep_goal": 10,
+}
+
+
+@dataclass
+class Award:
+    patient_id: str
+    task_name: str
+    points: int
+    award_key: str
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+    # Extra wallet fields to $set alongside the $inc (e.g. streak state)
+    wallet_fields: Dict = field(default_factory=dict)
+
+    def ledger_doc(self) -> dict:
+        doc = {
+            "patient_id": self.patient_id,
+            "task_name": self.task_name,
+            "completed": True,
+            "points_earned": self.points,
+            "timestamp": self.timestamp,
+            "award_key": self.award_key,
+            "wallet_applied": False,
+        }
+        if self.wallet_fields:
+            doc["wallet_fields"] = self.wallet_fields
+        return doc
+
+    @classmethod
+    def from_ledger(cls, doc: dict) -> "Award":
+        return cls(
+            patient_id=doc["patient_id"],
+            task_name=doc["task_name"],
+            points=doc["points_earned"],
+            award_key=doc["award_key"],
+            timestamp=doc["timestamp"],
+            wallet_fields=doc.get("wallet_fields", {}),
+        )
+
+
+def task_award(patient_id: str, task_name: str, now: Optional[datetime] = None) -> Award:
+    now = now or datetime.utcnow()
+    return Award(
+        patient_id=patient_id,
+        task_name=task_name,
+        points=TASK_POINTS[task_name],
+        award_key=f"{task_name}:{patient_id}:{now.date().isoformat()}",
+        timestamp=now,
+    )
+
+
+def _wallet_change(patient_id: str, points: int, fields: Dict, now: datetime, award_keys: List[str]):
+    """
+    Filter and update applying `award_keys` to a wallet at most once. If
+    the wallet already holds a key, the filter misses and the upsert fails
+    on the unique `patient_id` index instead of counting it again.
+    """
+    return (
+        {"patient_id": patient_id, "recent_award_keys": {"$nin": award_keys}},
+        {
+            "$inc": {"total_points": points},
+            "$set": dict(fields, updated_at=now),
+            "$push": {"recent_award_keys": {"$each": award_keys, "$slice": -RECENT_AWARD_KEYS}},
+        },
+    )
+
+
+def _wallet_update(patient_id: str, points: int, fields: Dict, now: datetime, award_keys: List[str]) -> UpdateOne:
+    return UpdateOne(*_wallet_change(patient_id, points, fields, now, award_keys), upsert=True)
+
+
+class PointsLedger:
+    def __init__(self, streak_bonus: int, streak_bonus_cap: int):
+        self.streak_bonus = streak_bonus
+        self.streak_bonus_cap = streak_bonus_cap
+
+        # Called with (patient_id, total_points) after a wallet changes
+        self.listeners: List[Callable[[str, int], None]] = []
+
+        self.awarded = 0
+        self.duplicates = 0
+        self.points = 0
+
+    def _changed(self, patient_id: str, total_points: int):
+        for listener in self.listeners:
+            try:
+                listener(patient_id, total_points)
+            except Exception:
+                logger.exception("Wallet listener failed")
+
+    async def _mark_applied(self, db, award_keys: List[str]):
+        await db[LEDGER_COLLECTION].update_many(
+            {"award_key": {"$in": award_keys}}, {"$set": {"wallet_applied": True}}
+        )
+
+    async def _unapplied(self, db, award_keys: List[str]) -> set:
+        """Keys among `award_keys` whose ledger entry never reached the wallet."""
+        cursor = db[LEDGER_COLLECTION].find(
+            {"award_key": {"$in": award_keys}, "wallet_applied": False}, {"award_key": 1}
+        )
+        return {doc["award_key"] async for doc in cursor}
+
+    # ---- Single award ----
+    async def award(self, db, award: Award) -> Optional[dict]:
+        """Record one award; returns the updated wallet, or None if already awarded."""
+        try:
+            await db[LEDGER_COLLECTION].insert_one(award.ledger_doc())
+        except DuplicateKeyError:
+            # A retry is only a duplicate once its wallet write has landed
+            if not await self._unapplied(db, [award.award_key]):
+                self.duplicates += 1
+                return None
+
+        try:
+            wallet = await db[WALLETS_COLLECTION].find_one_and_update(
+                *_wallet_change(award.patient_id, award.points, award.wallet_fields,
+                                award.timestamp, [award.award_key]),
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Wallet already counted this award; only the flag was missing
+            await self._mark_applied(db, [award.award_key])
+            self.duplicates += 1
+            return None
+
+        await self._mark_applied(db, [award.award_key])
+        self.awarded += 1
+        self.points += award.points
+        self._changed(award.patient_id, wallet["total_points"])
+        return wallet
+
+    # ---- Bulk award ----
+    async def award_many(self, db, awards: List[Award]) -> int:
+        """Record many awards in a few round trips; returns how many were new."""
+        if not awards:
+            return 0
+
+        new = awards
+        try:
+            await db[LEDGER_COLLECTION].insert_many(
+                [a.ledger_doc() for a in awards], ordered=False
+            )
+        except BulkWriteError as exc:
+            failed = set()
+            duplicates = []
+            for err in exc.details.get("writeErrors", []):
+                failed.add(err["index"])
+                if err.get("code") == DUPLICATE_KEY:
+                    duplicates.append(awards[err["index"]].award_key)
+                else:
+                    logger.warning("Award %s not recorded: %s",
+                                   awards[err["index"]].award_key, err.get("errmsg"))
+
+            # Re-recorded awards whose wallet write was lost go through again
+            pending = await self._unapplied(db, duplicates) if duplicates else set()
+            self.duplicates += len(duplicates) - len(pending)
+            new = [
+                a for i, a in enumerate(awards)
+                if i not in failed or a.award_key in pending
+            ]
+
+        if not new:
+            return 0
+
+        # One wallet update per patient, however many awards they got
+        deltas: Dict[str, int] = {}
+        fields: Dict[str, Dict] = {}
+        keys: Dict[str, List[str]] = {}
+        for a in new:
+            deltas[a.patient_id] = deltas.get(a.patient_id, 0) + a.points
+            fields.setdefault(a.patient_id, {}).update(a.wallet_fields)
+            keys.setdefault(a.patient_id, []).append(a.award_key)
+
+        now = datetime.utcnow()
+        patients = list(deltas)
+        try:
+            await db[WALLETS_COLLECTION].bulk_write(
+                [_wallet_update(pid, deltas[pid], fields[pid], now, keys[pid]) for pid in patients],
+                ordered=False,
+            )
+        except BulkWriteError as exc:
+            # A duplicate upsert means the wallet holds at least one of the
+            # keys; nothing was applied, so settle that patient key by key
+            retry = set()
+            for err in exc.details.get("writeErrors", []):
+                patient_id = patients[err["index"]]
+                if err.get("code") == DUPLICATE_KEY:
+                    retry.add(patient_id)
+                else:
+                    logger.warning("Wallet of %s not updated: %s", patient_id, err.get("errmsg"))
+                deltas.pop(patient_id)
+        else:
+            retry = set()
+
+        await self._mark_applied(db, [k for pid in deltas for k in keys[pid]])
+
+        applied = sum(len(keys[pid]) for pid in deltas)
+        self.awarded += applied
+        self.points += sum(deltas.values())
+        if deltas and self.listeners:
+            wallets = db[WALLETS_COLLECTION].find(
+                {"patient_id": {"$in": list(deltas)}}, {"patient_id": 1, "total_points": 1}
+            )
+            async for wallet in wallets:
+                self._changed(wallet["patient_id"], wallet["total_points"])
+
+        for a in new:
+            if a.patient_id in retry and await self.award(db, a) is not None:
+                applied += 1
+        return applied
+
+    # ---- Nightly streaks ----
+    async def award_daily_streaks(self, db, day: date, batch_size: int = 1000) -> int:
+        """
+        Streak bonus for every patient who completed a task on `day`:
+        `streak_bonus` points per consecutive active day, capped.
+        """
+        start = datetime.combine(day, time.min)
+        active = await db[LEDGER_COLLECTION].distinct(
+            "patient_id",
+            {"timestamp": {"$gte": start, "$lt": start + timedelta(days=1)},
+             "completed": True,
+             "task_name": {"$ne": STREAK_TASK}},
+        )
+
+        yesterday = (day - timedelta(days=1)).isoformat()
+        awarded = 0
+        for i in range(0, len(active), batch_size):
+            chunk = active[i: i + batch_size]
+            wallets = db[WALLETS_COLLECTION].find(
+                {"patient_id": {"$in": chunk}},
+                {"patient_id": 1, "streak": 1, "last_active_day": 1},
+            )
+            previous = {w["patient_id"]: w async for w in wallets}
+
+            awards = []
+            for patient_id in chunk:
+                wallet = previous.get(patient_id, {})
+                streak = 1
+                if wallet.get("last_active_day") == yesterday:
+                    streak = wallet.get("streak", 0) + 1
+                awards.append(Award(
+                    patient_id=patient_id,
+                    task_name=STREAK_TASK,
+                    points=self.streak_bonus * min(streak, self.streak_bonus_cap),
+                    award_key=f"{STREAK_TASK}:{patient_id}:{day.isoformat()}",
+                    timestamp=start + timedelta(days=1) - timedelta(microseconds=1),
+                    wallet_fields={"streak": streak, "last_active_day": day.isoformat()},
+                ))
+            awarded += await self.award_many(db, awards)
+
+        logger.info("Awarded streak bonuses to %d of %d active patients", awarded, len(active))
+        return awarded
+
+    async def run_nightly(self, db):
+        """Award yesterday's streaks shortly after each UTC midnight."""
+        while True:
+            now = datetime.utcnow()
+            next_run = datetime.combine(now.date() + timedelta(days=1), time(0, 5))
+            await asyncio.sleep((next_run - now).total_seconds())
+            try:
+                await self.award_daily_streaks(db, next_run.date() - timedelta(days=1))
+            except PyMongoError:
+                logger.exception("Nightly streak awards failed")
+
+    # ---- Repair ----
+    async def apply_pending(self, db, older_than: float = 60.0) -> int:
+        """Apply ledger entries whose wallet write never completed (e.g. a crash)."""
+        cutoff = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=older_than))
+        cursor = db[LEDGER_COLLECTION].find({"wallet_applied": False, "_id": {"$lt": cutoff}})
+        awards = [Award.from_ledger(doc) async for doc in cursor]
+        if not awards:
+            return 0
+
+        # One by one: each award key is checked against the wallet on its own
+        repaired = 0
+        for award in awards:
+            if await self.award(db, award) is not None:
+                repaired += 1
+        logger.warning("Applied %d of %d pending ledger entries to wallets", repaired, len(awards))
+        return repaired
+
+    async def run_repairs(self, db, interval: float):
+        while True:
+            try:
+                await self.apply_pending(db)
+            except PyMongoError:
+                logger.exception("Applying pending ledger entries failed")
+            await asyncio.sleep(interval)
+
+    async def reconcile_wallets(self, db):
+        """Recompute every wallet total from the ledger."""
+        await db[LEDGER_COLLECTION].aggregate([
+            {"$group": {"_id": "$patient_id", "total_points": {"$sum": "$points_earned"}}},
+            {"$project": {"_id": 0, "patient_id": "$_id", "total_points": 1}},
+            {"$merge": {"into": WALLETS_COLLECTION, "on": "patient_id",
+                        "whenMatched": "merge", "whenNotMatched": "insert"}},
+        ]).to_list(length=None)
+
+    def stats(self) -> dict:
+        return {
+            "awarded": self.awarded,
+            "duplicates": self.duplicates,
+            "points": self.points,
+        }
+
+
+points_ledger = PointsLedger(
+    streak_bonus=settings.GAMIFICATION_STREAK_BONUS,
+    streak_bonus_cap=settings.GAMIFICATION_STREAK_BONUS_CAP,
+)
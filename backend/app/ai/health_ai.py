@@ -0,0 +1,251 @@
+"""
+Vitals Anomaly Detection
+------------------------
+Online detector run on every ingested vitals reading:
+
+- threshold rules: clinical hard limits per vital type
+- z-score against a running mean/variance (Welford) per patient + type
+- sudden change against an EWMA of recent readings
+
+State is O(1) per (patient, vital type): four numbers (count, mean, M2,
+EWMA) held in NumPy arrays indexed by a row map, so millions of series
+stay compact.
+Each reading is judged against the baseline *before* it is folded in.
+
+The state is snapshotted to the `anomaly_state` collection (dirty rows
+only) and loaded back at startup, so a restart does not need to replay
+vitals history to rebuild baselines.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_COLLECTION = "anomaly_state"
+
+# (low, high) hard limits; None = no limit on that side
+VITAL_LIMITS: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "heart_rate": (40, 130),
+    "systolic_bp": (90, 180),
+    "diastolic_bp": (50, 120),
+    "spo2": (92, None),
+    "temperature": (35.0, 38.5),
+    "respiratory_rate": (8, 25),
+    "glucose": (70, 250),
+    "weight": (None, None),
+    "steps": (None, None),
+}
+
+
+@dataclass
+class Anomaly:
+    patient_id: str
+    type: str
+    value: float
+    timestamp: datetime
+    reasons: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "patient_id": self.patient_id,
+            "type": self.type,
+            "value": self.value,
+            "timestamp": self.timestamp,
+            "reasons": self.reasons,
+        }
+
+
+# --------------------------------------------------
+# Array-backed State Store
+# --------------------------------------------------
+class SeriesStateStore:
+    """
+    Rows of (count, mean, m2, ewma) per series key, in parallel arrays
+    that grow by doubling.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.keys: List[Tuple[str, str]] = []
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.mean = np.zeros(capacity, dtype=np.float64)
+        self.m2 = np.zeros(capacity, dtype=np.float64)
+        self.ewma = np.zeros(capacity, dtype=np.float64)
+        self.dirty: set = set()
+
+    def __len__(self):
+        return len(self.index)
+
+    def _grow(self):
+        capacity = len(self.count) * 2
+        for name in ("count", "mean", "m2", "ewma"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def row(self, key: Tuple[str, str]) -> int:
+        row = self.index.get(key)
+        if row is None:
+            row = len(self.index)
+            if row >= len(self.count):
+                self._grow()
+            self.index[key] = row
+            self.keys.append(key)
+        return row
+
+
+# --------------------------------------------------
+# Detector
+# --------------------------------------------------
+class AnomalyDetector:
+    def __init__(
+        self,
+        z_threshold: float,
+        min_samples: int,
+        ewma_alpha: float,
+        limits: Dict[str, Tuple[Optional[float], Optional[float]]] = VITAL_LIMITS,
+    ):
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.limits = limits
+        self.state = SeriesStateStore()
+
+        # Called with every detected Anomaly (e.g. to raise alerts)
+        self.listeners: List[Callable[[Anomaly], None]] = []
+
+        self.observed = 0
+        self.flagged = 0
+
+    def observe(self, patient_id: str, vital_type: str, value: float, timestamp: datetime) -> Optional[Anomaly]:
+        s = self.state
+        row = s.row((patient_id, vital_type))
+        n = int(s.count[row])
+        reasons = []
+
+        # ---- Threshold rules ----
+        low, high = self.limits.get(vital_type, (None, None))
+        if low is not None and value < low:
+            reasons.append(f"below {low}")
+        if high is not None and value > high:
+            reasons.append(f"above {high}")
+
+        # ---- Statistical rules (need a baseline) ----
+        if n >= self.min_samples:
+            std = float(np.sqrt(s.m2[row] / (n - 1)))
+            if std > 0:
+                z = (value - s.mean[row]) / std
+                if abs(z) > self.z_threshold:
+                    reasons.append(f"z-score {z:+.1f}")
+                jump = (value - s.ewma[row]) / std
+                if abs(jump) > self.z_threshold:
+                    reasons.append(f"sudden change {jump:+.1f} sd from recent trend")
+
+        # ---- Fold reading into state (Welford + EWMA) ----
+        n += 1
+        delta = value - s.mean[row]
+        s.mean[row] += delta / n
+        s.m2[row] += delta * (value - s.mean[row])
+        s.ewma[row] = value if n == 1 else (
+            self.ewma_alpha * value + (1 - self.ewma_alpha) * s.ewma[row]
+        )
+        s.count[row] = n
+        s.dirty.add(row)
+
+        self.observed += 1
+        if not reasons:
+            return None
+
+        self.flagged += 1
+        anomaly = Anomaly(patient_id, vital_type, value, timestamp, reasons)
+        for listener in self.listeners:
+            try:
+                listener(anomaly)
+            except Exception:
+                logger.exception("Anomaly listener failed")
+        return anomaly
+
+    def observe_docs(self, docs: List[dict]) -> List[Anomaly]:
+        """Run the detector over vitals documents as built for ingestion."""
+        anomalies = []
+        for doc in docs:
+            meta = doc["meta"]
+            anomaly = self.observe(meta["patient_id"], meta["type"], doc["value"], doc["timestamp"])
+            if anomaly:
+                anomalies.append(anomaly)
+        return anomalies
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    async def load(self, db):
+        s = self.state
+        async for doc in db[STATE_COLLECTION].find({}):
+            row = s.row((doc["patient_id"], doc["type"]))
+            s.count[row] = doc["count"]
+            s.mean[row] = doc["mean"]
+            s.m2[row] = doc["m2"]
+            s.ewma[row] = doc["ewma"]
+        s.dirty.clear()
+        logger.info("Loaded anomaly state for %d series", len(s))
+
+    async def snapshot(self, db):
+        s = self.state
+        if not s.dirty:
+            return
+
+        rows, s.dirty = s.dirty, set()
+        ops = []
+        for row in rows:
+            patient_id, vital_type = s.keys[row]
+            ops.append(UpdateOne(
+                {"_id": f"{patient_id}|{vital_type}"},
+                {"$set": {
+                    "patient_id": patient_id,
+                    "type": vital_type,
+                    "count": int(s.count[row]),
+                    "mean": float(s.mean[row]),
+                    "m2": float(s.m2[row]),
+                    "ewma": float(s.ewma[row]),
+                }},
+                upsert=True,
+            ))
+        try:
+            await db[STATE_COLLECTION].bulk_write(ops, ordered=False)
+        except PyMongoError:
+            s.dirty |= rows
+            raise
+
+    async def run_snapshots(self, db, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.snapshot(db)
+            except PyMongoError:
+                logger.exception("Anomaly state snapshot failed; will retry")
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self.state),
+            "observed": self.observed,
+            "flagged": self.flagged,
+            "dirty": len(self.state.dirty),
+        }
+
+
+anomaly_detector = AnomalyDetector(
+    z_threshold=settings.ANOMALY_Z_THRESHOLD,
+    min_samples=settings.ANOMALY_MIN_SAMPLES,
+    ewma_alpha=settings.ANOMALY_EWMA_ALPHA,
+)
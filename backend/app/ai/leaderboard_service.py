@@ -0,0 +1,263 @@
+"""
+Leaderboards
+------------
+Rankings by wallet `total_points` for three scopes:
+
+- global: every patient with a wallet
+- clinic: patients sharing `clinic_id` on their profile
+- family: patients linked to the same family member
+
+A doctor reads a clinic's board only if `clinic_staff` lists them for
+that clinic. Those records are maintained by operators; no API route
+writes them, so a doctor cannot grant themselves access.
+
+Each board is a sorted array of `(-points, patient_id)` plus a
+patient -> points map. Rank and top-N are `bisect` lookups / slices;
+a points change removes and re-inserts one key, so nothing ever
+re-sorts the wallet collection on a page view. Ties share a rank
+(1, 1, 3, ...).
+
+Boards are built at startup from `points_wallets`, profiles and family
+links, then kept current by the points ledger listener (which passes the
+wallet total the update returned) and the profile/link hooks. Those only
+fire in the worker that served the request, so every snapshot interval
+each worker rebuilds its boards from the database. With several workers
+a board can lag by up to that interval; snapshots are always taken from
+a full rebuild, so workers never overwrite each other with partial
+views. Changed boards are snapshotted (top entries only) to the
+`leaderboards` collection for other consumers.
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.ai.gamification_service import WALLETS_COLLECTION
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLLECTION = "leaderboards"
+STAFF_COLLECTION = "clinic_staff"
+
+GLOBAL = ("global", "")
+
+
+class Leaderboard:
+    def __init__(self):
+        self._keys: List[Tuple[int, str]] = []
+        self._points: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, patient_id: str):
+        return patient_id in self._points
+
+    def load(self, points: Dict[str, int]):
+        self._points = dict(points)
+        self._keys = sorted((-p, pid) for pid, p in self._points.items())
+
+    def same_as(self, points: Dict[str, int]) -> bool:
+        return self._points == points
+
+    def set(self, patient_id: str, points: int):
+        old = self._points.get(patient_id)
+        if old == points:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, patient_id))]
+        self._points[patient_id] = points
+        insort(self._keys, (-points, patient_id))
+
+    def remove(self, patient_id: str):
+        old = self._points.pop(patient_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, patient_id))]
+
+    def rank(self, patient_id: str) -> Optional[Tuple[int, int]]:
+        """(rank, points), or None if the patient is not on this board."""
+        points = self._points.get(patient_id)
+        if points is None:
+            return None
+        return bisect_left(self._keys, (-points,)) + 1, points
+
+    def points(self, patient_id: str) -> Optional[int]:
+        return self._points.get(patient_id)
+
+    def top(self, n: int, offset: int = 0) -> List[dict]:
+        entries = []
+        previous = None
+        for neg_points, patient_id in self._keys[offset: offset + n]:
+            if neg_points != previous:
+                rank = bisect_left(self._keys, (neg_points,)) + 1
+                previous = neg_points
+            entries.append({"rank": rank, "patient_id": patient_id, "points": -neg_points})
+        return entries
+
+
+class LeaderboardRegistry:
+    def __init__(self, snapshot_size: int):
+        self.snapshot_size = snapshot_size
+
+        self.boards: Dict[Tuple[str, str], Leaderboard] = {GLOBAL: Leaderboard()}
+        self._clinic: Dict[str, str] = {}
+        self._families: Dict[str, Set[str]] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+
+        self.updates = 0
+
+    def board(self, scope: str, group_id: str = "") -> Optional[Leaderboard]:
+        return self.boards.get((scope, group_id))
+
+    def _memberships(self, patient_id: str) -> List[Tuple[str, str]]:
+        keys = [GLOBAL]
+        clinic_id = self._clinic.get(patient_id)
+        if clinic_id:
+            keys.append(("clinic", clinic_id))
+        keys.extend(("family", family_id) for family_id in self._families.get(patient_id, ()))
+        return keys
+
+    def _points(self, patient_id: str) -> int:
+        return self.boards[GLOBAL].points(patient_id) or 0
+
+    def _join(self, key: Tuple[str, str], patient_id: str):
+        self.boards.setdefault(key, Leaderboard()).set(patient_id, self._points(patient_id))
+        self._dirty.add(key)
+
+    def _leave(self, key: Tuple[str, str], patient_id: str):
+        board = self.boards.get(key)
+        if board is None:
+            return
+        board.remove(patient_id)
+        self._dirty.add(key)
+        if not board:
+            del self.boards[key]
+
+    # ---- Score updates ----
+    def set_points(self, patient_id: str, points: int):
+        """Points ledger listener: the wallet total after an award."""
+        for key in self._memberships(patient_id):
+            self.boards.setdefault(key, Leaderboard()).set(patient_id, points)
+            self._dirty.add(key)
+        self.updates += 1
+
+    # ---- Membership updates ----
+    def set_clinic(self, patient_id: str, clinic_id: Optional[str]):
+        old = self._clinic.get(patient_id)
+        if old == clinic_id:
+            return
+        if old:
+            self._leave(("clinic", old), patient_id)
+            del self._clinic[patient_id]
+        if clinic_id:
+            self._clinic[patient_id] = clinic_id
+            self._join(("clinic", clinic_id), patient_id)
+
+    def link_family(self, family_id: str, patient_id: str):
+        self._families.setdefault(patient_id, set()).add(family_id)
+        self._join(("family", family_id), patient_id)
+
+    def unlink_family(self, family_id: str, patient_id: str):
+        self._families.get(patient_id, set()).discard(family_id)
+        self._leave(("family", family_id), patient_id)
+
+    def family_groups(self, patient_id: str) -> List[str]:
+        return sorted(self._families.get(patient_id, ()))
+
+    def clinic_of(self, patient_id: str) -> Optional[str]:
+        return self._clinic.get(patient_id)
+
+    async def staff_clinics(self, db, doctor_id: str) -> List[str]:
+        """Clinics a doctor works at, per the operator-maintained `clinic_staff`."""
+        cursor = db[STAFF_COLLECTION].find({"doctor_user_id": doctor_id}, {"clinic_id": 1})
+        return sorted({doc["clinic_id"] async for doc in cursor})
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    async def load(self, db):
+        """Build every board from wallets, profiles and family links."""
+        points: Dict[str, int] = {}
+        async for wallet in db[WALLETS_COLLECTION].find({}, {"patient_id": 1, "total_points": 1}):
+            points[wallet["patient_id"]] = wallet.get("total_points", 0)
+
+        self._clinic = {}
+        async for profile in db.patient_profiles.find(
+            {"clinic_id": {"$nin": [None, ""]}}, {"user_id": 1, "clinic_id": 1}
+        ):
+            self._clinic[profile["user_id"]] = profile["clinic_id"]
+
+        self._families = {}
+        async for link in db.family_links.find({}, {"family_user_id": 1, "patient_user_id": 1}):
+            self._families.setdefault(link["patient_user_id"], set()).add(link["family_user_id"])
+
+        groups: Dict[Tuple[str, str], Dict[str, int]] = {GLOBAL: points}
+        for patient_id, clinic_id in self._clinic.items():
+            groups.setdefault(("clinic", clinic_id), {})[patient_id] = points.get(patient_id, 0)
+        for patient_id, family_ids in self._families.items():
+            for family_id in family_ids:
+                groups.setdefault(("family", family_id), {})[patient_id] = points.get(patient_id, 0)
+
+        # Only boards that differ from what this worker had need a snapshot
+        old = self.boards
+        self.boards = {}
+        for key, members in groups.items():
+            self.boards[key] = Leaderboard()
+            self.boards[key].load(members)
+            if key not in old or not old[key].same_as(members):
+                self._dirty.add(key)
+        self._dirty |= set(old) - set(self.boards)
+        logger.debug("Loaded %d leaderboards (%d ranked patients)", len(self.boards), len(points))
+
+    async def snapshot(self, db):
+        if not self._dirty:
+            return
+
+        keys, self._dirty = self._dirty, set()
+        now = datetime.utcnow()
+        ops = []
+        for scope, group_id in keys:
+            board = self.boards.get((scope, group_id))
+            ops.append(UpdateOne(
+                {"_id": f"{scope}:{group_id}"},
+                {"$set": {
+                    "scope": scope,
+                    "group_id": group_id,
+                    "size": len(board) if board else 0,
+                    "top": board.top(self.snapshot_size) if board else [],
+                    "generated_at": now,
+                }},
+                upsert=True,
+            ))
+        try:
+            await db[SNAPSHOT_COLLECTION].bulk_write(ops, ordered=False)
+        except PyMongoError:
+            self._dirty |= keys
+            raise
+
+    async def run_snapshots(self, db, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Pick up awards and membership changes made by other workers
+                await self.load(db)
+                await self.snapshot(db)
+            except PyMongoError:
+                logger.exception("Leaderboard snapshot failed; will retry")
+
+    def stats(self) -> dict:
+        return {
+            "boards": len(self.boards),
+            "ranked": len(self.boards[GLOBAL]) if GLOBAL in self.boards else 0,
+            "updates": self.updates,
+            "dirty": len(self._dirty),
+        }
+
+
+leaderboards = LeaderboardRegistry(snapshot_size=settings.LEADERBOARD_SNAPSHOT_SIZE)
@@ -0,0 +1,321 @@
+"""
+Notification Dispatch
+---------------------
+Request handlers and background jobs call `notifier.notify(...)`, which
+only puts the notification on an asyncio queue; nothing is ever sent
+inline. A pool of workers drains the queue:
+
+- batching: a worker collects up to `batch_size` notifications (or
+  whatever arrives within `batch_window` seconds) and hands them to the
+  transport grouped per channel
+- coalescing: notifications with the same `dedupe_key` inside
+  `coalesce_seconds` are dropped at enqueue time, so a burst of readings
+  raises one alert
+- retries: failed sends are retried with exponential backoff + jitter
+
+Transports: `StdoutTransport` (log lines) and `FileTransport` (NDJSON
+file) for local runs and tests; real push/SMS/email providers plug in
+behind the same `send_batch` interface.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    recipient_user_id: str
+    kind: str        # "medication_reminder" | "anomaly_alert" | "family_link"
+    title: str
+    body: str
+    channel: str = "push"
+    data: Dict = field(default_factory=dict)
+    dedupe_key: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+# --------------------------------------------------
+# Transports
+# --------------------------------------------------
+class Transport(abc.ABC):
+    @abc.abstractmethod
+    async def send_batch(self, channel: str, notifications: List[Notification]):
+        ...
+
+
+def _to_line(channel: str, notification: Notification) -> str:
+    record = asdict(notification)
+    record["channel"] = channel
+    return json.dumps(record, default=str)
+
+
+class StdoutTransport(Transport):
+    async def send_batch(self, channel, notifications):
+        for notification in notifications:
+            sys.stdout.write(_to_line(channel, notification) + "\n")
+        sys.stdout.flush()
+
+
+class FileTransport(Transport):
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, lines: List[str]):
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n")
+
+    async def send_batch(self, channel, notifications):
+        lines = [_to_line(channel, n) for n in notifications]
+        await asyncio.to_thread(self._append, lines)
+
+
+def build_transport() -> Transport:
+    if settings.NOTIFICATION_TRANSPORT == "file":
+        return FileTransport(settings.NOTIFICATION_FILE_PATH)
+    return StdoutTransport()
+
+
+# --------------------------------------------------
+# Dispatcher
+# --------------------------------------------------
+class NotificationDispatcher:
+    def __init__(
+        self,
+        transport: Transport,
+        workers: int,
+        queue_size: int,
+        batch_size: int,
+        batch_window: float,
+        coalesce_seconds: float,
+        max_retries: int,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.transport = transport
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.coalesce_seconds = coalesce_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._recent: Dict[str, float] = {}
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+
+    # ---- Producer side ----
+    def is_coalesced(self, dedupe_key: str) -> bool:
+        """True if a notification with this key was queued within the coalesce window."""
+        return self._recent.get(dedupe_key, 0) > time.monotonic()
+
+    def notify(self, notification: Notification) -> bool:
+        """Queue a notification; never blocks. Returns False if it was not queued."""
+        if self._queue is None:
+            self.dropped += 1
+            logger.warning("Notification dispatcher not running; dropped %s", notification.kind)
+            return False
+
+        if notification.dedupe_key and self.is_coalesced(notification.dedupe_key):
+            self.coalesced += 1
+            return False
+
+        try:
+            self._queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Notification queue full; dropped %s", notification.kind)
+            return False
+
+        # Only a queued notification suppresses repeats; a dropped one can be retried
+        if notification.dedupe_key:
+            now = time.monotonic()
+            self._recent[notification.dedupe_key] = now + self.coalesce_seconds
+            if len(self._recent) > 10 * self.queue_size:
+                self._recent = {k: t for k, t in self._recent.items() if t > now}
+
+        self.enqueued += 1
+        return True
+
+    # ---- Worker side ----
+    async def _next_batch(self) -> List[Notification]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send_with_retry(self, channel: str, notifications: List[Notification]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.transport.send_batch(channel, notifications)
+                self.sent += len(notifications)
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    self.failed += len(notifications)
+                    logger.exception(
+                        "Giving up on %d %s notifications", len(notifications), channel
+                    )
+                    return
+                self.retries += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                by_channel: Dict[str, List[Notification]] = defaultdict(list)
+                for notification in batch:
+                    by_channel[notification.channel].append(notification)
+
+                for channel, notifications in by_channel.items():
+                    await self._send_with_retry(channel, notifications)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping with %d undelivered notifications", self._queue.qsize())
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+
+notifier = NotificationDispatcher(
+    transport=build_transport(),
+    workers=settings.NOTIFICATION_WORKERS,
+    queue_size=settings.NOTIFICATION_QUEUE_SIZE,
+    batch_size=settings.NOTIFICATION_BATCH_SIZE,
+    batch_window=settings.NOTIFICATION_BATCH_WINDOW_SECONDS,
+    coalesce_seconds=settings.NOTIFICATION_COALESCE_SECONDS,
+    max_retries=settings.NOTIFICATION_MAX_RETRIES,
+)
+
+
+# --------------------------------------------------
+# Event Hooks
+# --------------------------------------------------
+def _anomaly_key(anomaly, user_id: str) -> str:
+    return f"anomaly:{anomaly.patient_id}:{anomaly.type}:{user_id}"
+
+
+async def _alert_for_anomaly(anomaly):
+    from app.db.mongodb import get_db
+
+    reasons = ", ".join(anomaly.reasons)
+    title = f"Unusual {anomaly.type.replace('_', ' ')} reading"
+    body = f"{anomaly.value:g} ({reasons})"
+    data = {"type": anomaly.type, "value": anomaly.value, "reasons": anomaly.reasons}
+
+    recipients = [anomaly.patient_id]
+    links = get_db().family_links.find(
+        {"patient_user_id": anomaly.patient_id}, {"family_user_id": 1}
+    )
+    async for link in links:
+        recipients.append(link["family_user_id"])
+
+    for user_id in recipients:
+        notifier.notify(Notification(
+            recipient_user_id=user_id,
+            kind="anomaly_alert",
+            title=title,
+            body=body,
+            data=dict(data, patient_user_id=anomaly.patient_id),
+            dedupe_key=_anomaly_key(anomaly, user_id),
+        ))
+
+
+# (patient_id, type) pairs whose alert task has not queued anything yet,
+# and the tasks themselves so they are not garbage-collected mid-flight
+_alerts_in_flight: Set[Tuple[str, str]] = set()
+_alert_tasks: Set[asyncio.Task] = set()
+
+
+def _alert_done(task: asyncio.Task, series: Tuple[str, str]):
+    _alert_tasks.discard(task)
+    _alerts_in_flight.discard(series)
+    if not task.cancelled() and task.exception():
+        logger.error("Anomaly alert failed: %s", task.exception())
+
+
+def anomaly_listener(anomaly):
+    """AnomalyDetector listener: alert the patient and linked family."""
+    # The patient's alert is queued together with the family's, so while it
+    # is coalesced (or still being sent) the whole fan-out is too: skip the
+    # family_links lookup. Checked synchronously, so a burst reported in
+    # one batch starts a single task.
+    series = (anomaly.patient_id, anomaly.type)
+    if series in _alerts_in_flight or notifier.is_coalesced(_anomaly_key(anomaly, anomaly.patient_id)):
+        notifier.coalesced += 1
+        return
+    _alerts_in_flight.add(series)
+    task = asyncio.get_running_loop().create_task(_alert_for_anomaly(anomaly))
+    _alert_tasks.add(task)
+    task.add_done_callback(lambda t: _alert_done(t, series))
+
+
+def notify_family_link(patient_user_id: str, family_user_id: str, relation: str, linked: bool):
+    action = "linked to" if linked else "unlinked from"
+    notifier.notify(Notification(
+        recipient_user_id=patient_user_id,
+        kind="family_link",
+        title="Family access changed",
+        body=f"A family member ({relation}) was {action} your records.",
+        channel="email",
+        data={"family_user_id": family_user_id, "relation": relation, "linked": linked},
+    ))
@@ -0,0 +1,198 @@
+"""
+Pharmacy Catalog
+----------------
+Medicine catalog bulk-loaded from a file and served from memory:
+
+- `*.csv` with a header row: name, generic_name, form, strength
+- `*.ndjson` / `*.jsonl`: one {"name", "generic_name", "form", "strength"} per line
+
+Prefix search runs over two sorted key arrays with `bisect`:
+
+1. normalised product and generic names ("para" -> "Paracetamol 500mg Tablet")
+2. later word starts of product names ("clav" -> "Amoxicillin + Clavulanic ...")
+
+Whole-name matches rank before word matches; a lookup is a binary search
+plus a short forward scan that stops after `limit` distinct medicines,
+so it stays well under a millisecond for large catalogs. Prescription
+creation resolves medicine names by product or generic name.
+
+Like the symptom knowledge base, the catalog is built off the request
+path, swapped in as a single reference and hot-reloaded when its file
+changes (`watch_catalog`).
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import threading
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent / "data" / "medicine_catalog.csv"
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+@dataclass(frozen=True)
+class Medicine:
+    name: str
+    generic_name: str = ""
+    form: str = ""
+    strength: str = ""
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _PrefixIndex:
+    """Sorted (key, medicine index) pairs searched with bisect."""
+
+    def __init__(self, pairs: Iterable[Tuple[str, int]]):
+        pairs = sorted(set(pairs))
+        self.keys: List[str] = [key for key, _ in pairs]
+        self.ids: List[int] = [i for _, i in pairs]
+
+    def scan(self, prefix: str):
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            yield self.ids[i]
+            i += 1
+
+
+class MedicineCatalog:
+    def __init__(self, medicines: List[Medicine], version: str = "unversioned"):
+        self.version = version
+        self.medicines = medicines
+        self._by_name: Dict[str, int] = {}
+        self._by_generic: Dict[str, int] = {}
+
+        names = []
+        words = []
+        for i, medicine in enumerate(medicines):
+            key = normalize_name(medicine.name)
+            self._by_name.setdefault(key, i)
+            names.append((key, i))
+            if medicine.generic_name:
+                generic = normalize_name(medicine.generic_name)
+                self._by_generic.setdefault(generic, i)
+                names.append((generic, i))
+
+            tokens = key.split(" ")
+            for pos in range(1, len(tokens)):
+                if tokens[pos][:1].isalpha():
+                    words.append((" ".join(tokens[pos:]), i))
+
+        self._names = _PrefixIndex(names)
+        self._words = _PrefixIndex(words)
+
+    def __len__(self):
+        return len(self.medicines)
+
+    def search(self, query: str, limit: int = 10) -> List[Medicine]:
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+
+        seen = set()
+        results = []
+        for index in (self._names, self._words):
+            for i in index.scan(prefix):
+                if i in seen:
+                    continue
+                seen.add(i)
+                results.append(self.medicines[i])
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def lookup(self, name: str) -> Optional[Medicine]:
+        """Exact (case/whitespace-insensitive) product name match."""
+        i = self._by_name.get(normalize_name(name))
+        return None if i is None else self.medicines[i]
+
+    def lookup_generic(self, name: str) -> Optional[Medicine]:
+        """Some medicine whose generic name (salt) is `name`."""
+        i = self._by_generic.get(normalize_name(name))
+        return None if i is None else self.medicines[i]
+
+
+# --------------------------------------------------
+# Loading
+# --------------------------------------------------
+def _read_rows(path: Path) -> Iterable[dict]:
+    with open(path, encoding="utf-8", newline="") as fh:
+        if path.suffix.lower() in (".ndjson", ".jsonl"):
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fh)
+
+
+def load_catalog(path) -> MedicineCatalog:
+    path = Path(path)
+    medicines = []
+    for row in _read_rows(path):
+        name = (row.get("name") or "").strip()
+        if not name:
+            continue
+        medicines.append(Medicine(
+            name=name,
+            generic_name=(row.get("generic_name") or "").strip(),
+            form=(row.get("form") or "").strip(),
+            strength=(row.get("strength") or "").strip(),
+        ))
+    return MedicineCatalog(medicines, version=f"{path.name}:{int(path.stat().st_mtime)}")
+
+
+def _catalog_path() -> Path:
+    return Path(settings.PHARMACY_CATALOG_PATH) if settings.PHARMACY_CATALOG_PATH else DEFAULT_CATALOG_PATH
+
+
+def _mtime(path: Path) -> float:
+    return path.stat().st_mtime
+
+
+_reload_lock = threading.Lock()
+_active_path = _catalog_path()
+_active_mtime = _mtime(_active_path)
+_active_catalog = load_catalog(_active_path)
+
+
+def get_catalog() -> MedicineCatalog:
+    return _active_catalog
+
+
+def reload_catalog(path=None) -> MedicineCatalog:
+    """Build a catalog from `path` (default: the active file) and swap it in."""
+    global _active_catalog, _active_path, _active_mtime
+
+    with _reload_lock:
+        path = Path(path) if path else _active_path
+        mtime = _mtime(path)
+        catalog = load_catalog(path)
+        _active_catalog, _active_path, _active_mtime = catalog, path, mtime
+
+    logger.info("Loaded pharmacy catalog %s (%d medicines)", path, len(catalog))
+    return catalog
+
+
+async def watch_catalog(interval: float):
+    """Poll the active file's mtime and reload in a worker thread when it changes."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if _mtime(_active_path) != _active_mtime:
+                await asyncio.to_thread(reload_catalog)
+        except Exception:
+            logger.exception("Pharmacy catalog reload failed; keeping version %s",
+                             _active_catalog.version)
@@ -0,0 +1,283 @@
+"""
+Medication Reminders
+--------------------
+Prescriptions may carry a dose schedule:
+
+    "schedule": {"times": ["08:00", "20:00"], "timezone": "Asia/Kolkata",
+                 "start_date": "2024-05-01", "end_date": "2024-05-14"}
+
+The engine keeps, per active schedule, only its *next* dose in a min-heap
+ordered by fire time. One worker sleeps until the earliest dose (or until
+a schedule changes), fires every due reminder through the notifier, and
+pushes that schedule's following dose. Memory and per-tick work are
+proportional to the number of active schedules and due doses, never to
+the size of the prescriptions collection, which is only read once at
+startup to rebuild the heap.
+
+Updates and cancellations bump a per-prescription version; stale heap
+entries are discarded lazily when they surface.
+
+Every worker process runs its own engine, and an update or delete only
+reaches the heap of the worker that served it. So before firing a dose
+the engine re-reads the prescription: a deleted or rescheduled one is
+dropped or rescheduled instead of fired. It then claims the dose in
+`reminder_claims` (one document per prescription holding the last
+claimed dose time); only the worker whose conditional upsert advances
+that time sends the reminder.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.ai.notification_service import Notification, notifier
+from app.db.mongodb import get_db
+
+logger = logging.getLogger(__name__)
+
+CLAIMS_COLLECTION = "reminder_claims"
+
+
+@dataclass
+class ActiveSchedule:
+    prescription_id: str
+    patient_user_id: str
+    medicines: List[str]
+    times: List[time]
+    tz: pytz.BaseTzInfo
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    @classmethod
+    def from_prescription(cls, doc: dict) -> Optional["ActiveSchedule"]:
+        schedule = doc.get("schedule")
+        if not schedule or not schedule.get("times"):
+            return None
+
+        def as_date(value):
+            if value is None or isinstance(value, date) and not isinstance(value, datetime):
+                return value
+            if isinstance(value, datetime):
+                return value.date()
+            return date.fromisoformat(value)
+
+        return cls(
+            prescription_id=str(doc["_id"]),
+            patient_user_id=doc["patient_user_id"],
+            medicines=list(doc.get("medicines") or []),
+            times=sorted(time.fromisoformat(t) for t in schedule["times"]),
+            tz=pytz.timezone(schedule.get("timezone") or "UTC"),
+            start_date=as_date(schedule.get("start_date")),
+            end_date=as_date(schedule.get("end_date")),
+        )
+
+    def next_dose(self, after: datetime) -> Optional[datetime]:
+        """First dose strictly after `after` (naive UTC), as naive UTC."""
+        local_day = pytz.utc.localize(after).astimezone(self.tz).date()
+        if self.start_date and local_day < self.start_date:
+            local_day = self.start_date
+
+        # Today's remaining doses, else the next day's; one spare day covers
+        # a dose time that falls into a DST gap
+        for _ in range(3):
+            if self.end_date and local_day > self.end_date:
+                return None
+            for dose_time in self.times:
+                local = self.tz.localize(datetime.combine(local_day, dose_time))
+                fire_at = local.astimezone(pytz.utc).replace(tzinfo=None)
+                if fire_at > after:
+                    return fire_at
+            local_day += timedelta(days=1)
+        return None
+
+
+class ReminderEngine:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, str, int]] = []
+        self._schedules: Dict[str, ActiveSchedule] = {}
+        self._versions: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.fired = 0
+        self.claimed_elsewhere = 0
+
+    def __len__(self):
+        return len(self._schedules)
+
+    # ---- Schedule management ----
+    def _push(self, schedule: ActiveSchedule, after: datetime):
+        fire_at = schedule.next_dose(after)
+        if fire_at is None:
+            # Course finished
+            self._schedules.pop(schedule.prescription_id, None)
+            return
+        version = self._versions[schedule.prescription_id]
+        heapq.heappush(self._heap, (fire_at, next(self._seq), schedule.prescription_id, version))
+
+    def schedule(self, prescription: dict):
+        """Add or replace the reminders for a prescription document."""
+        prescription_id = str(prescription["_id"])
+        self.cancel(prescription_id)
+
+        schedule = ActiveSchedule.from_prescription(prescription)
+        if schedule is None:
+            return
+
+        self._schedules[prescription_id] = schedule
+        was_first = not self._heap
+        self._push(schedule, datetime.utcnow())
+
+        if self._wakeup and (was_first or self._heap[0][2] == prescription_id):
+            self._wakeup.set()
+
+    def cancel(self, prescription_id: str):
+        self._schedules.pop(prescription_id, None)
+        # Invalidates any heap entry still pointing at the old schedule
+        self._versions[prescription_id] = self._versions.get(prescription_id, 0) + 1
+
+    async def rebuild(self, db):
+        """Load every prescription that still has doses ahead."""
+        self._heap.clear()
+        self._schedules.clear()
+
+        today = datetime.utcnow().date().isoformat()
+        cursor = db.prescriptions.find(
+            {
+                "schedule.times.0": {"$exists": True},
+                "$or": [
+                    {"schedule.end_date": None},
+                    {"schedule.end_date": {"$gte": today}},
+                ],
+            },
+            {"patient_user_id": 1, "medicines": 1, "schedule": 1},
+        )
+        async for doc in cursor:
+            try:
+                self.schedule(doc)
+            except (ValueError, pytz.UnknownTimeZoneError):
+                logger.warning("Skipping invalid schedule on prescription %s", doc["_id"])
+        logger.info("Loaded %d medication schedules", len(self._schedules))
+
+    # ---- Firing ----
+    async def _refresh(self, schedule: ActiveSchedule) -> Optional[ActiveSchedule]:
+        """
+        The stored version of a due schedule, or None if it was deleted or
+        its dose times changed in another worker (then it is rescheduled).
+        """
+        prescription_id = schedule.prescription_id
+        try:
+            doc = await get_db().prescriptions.find_one(
+                {"_id": ObjectId(prescription_id)},
+                {"patient_user_id": 1, "medicines": 1, "schedule": 1},
+            )
+        except PyMongoError:
+            logger.exception("Could not re-read prescription %s", prescription_id)
+            return schedule
+
+        try:
+            fresh = ActiveSchedule.from_prescription(doc) if doc else None
+        except (ValueError, pytz.UnknownTimeZoneError):
+            fresh = None
+        if fresh is None:
+            self.cancel(prescription_id)
+            return None
+
+        timing = (fresh.times, fresh.tz.zone, fresh.start_date, fresh.end_date)
+        if timing != (schedule.times, schedule.tz.zone, schedule.start_date, schedule.end_date):
+            self.schedule(doc)
+            return None
+
+        self._schedules[prescription_id] = fresh
+        return fresh
+
+    async def _claim(self, prescription_id: str, fire_at: datetime) -> bool:
+        """True if this process is the first to claim the dose."""
+        try:
+            result = await get_db()[CLAIMS_COLLECTION].update_one(
+                {"_id": prescription_id, "fire_at": {"$lt": fire_at}},
+                {"$set": {"fire_at": fire_at}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The claim exists with this dose or a later one
+            self.claimed_elsewhere += 1
+            return False
+        except PyMongoError:
+            # A duplicate reminder beats a missed dose
+            logger.exception("Could not claim reminder for prescription %s", prescription_id)
+            return True
+        return bool(result.upserted_id or result.modified_count)
+
+    def _fire(self, schedule: ActiveSchedule, fire_at: datetime):
+        medicines = ", ".join(schedule.medicines) or "your medication"
+        notifier.notify(Notification(
+            recipient_user_id=schedule.patient_user_id,
+            kind="medication_reminder",
+            title="Medication reminder",
+            body=f"Time to take {medicines}.",
+            data={"prescription_id": schedule.prescription_id, "dose_at": fire_at.isoformat()},
+            dedupe_key=f"reminder:{schedule.prescription_id}:{fire_at.isoformat()}",
+        ))
+        self.fired += 1
+
+    async def fire_due(self, now: datetime) -> int:
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, prescription_id, version = heapq.heappop(self._heap)
+            schedule = self._schedules.get(prescription_id)
+            if schedule is None or self._versions.get(prescription_id) != version:
+                continue   # stale entry
+            schedule = await self._refresh(schedule)
+            if schedule is None:
+                continue
+            self._push(schedule, fire_at)
+            if await self._claim(prescription_id, fire_at):
+                self._fire(schedule, fire_at)
+                fired += 1
+        return fired
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            await self.fire_due(now)
+
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "active_schedules": len(self._schedules),
+            "heap_size": len(self._heap),
+            "fired": self.fired,
+            "claimed_elsewhere": self.claimed_elsewhere,
+        }
+
+
+reminder_engine = ReminderEngine()
@@ -0,0 +1,217 @@
+"""
+Symptom Knowledge Base
+----------------------
+Loads the symptom model from disk, compiles it into NumPy lookup
+structures and swaps it in atomically at runtime.
+
+Supported formats:
+- `*.json`: {"version", "conditions": {condition: {symptom: weight}},
+  "high_risk_symptoms": [...], "synonyms": {alias: symptom}}
+- a directory (compact binary, for large catalogs): `kb.json` with
+  {"version", "conditions": [...], "symptoms": [...], "high_risk_symptoms": [...],
+  "synonyms": {...}}
+  next to `weights.npy`, a (conditions x symptoms) float matrix that is
+  memory-mapped instead of read into memory.
+
+Compilation always happens off the request path (at import, or in a
+worker thread on reload); requests only ever read `get_model()`, which
+is a single reference swap.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.ai.symptom_normalizer import SymptomNormalizer
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KB_PATH = Path(__file__).parent / "data" / "symptom_kb.json"
+
+
+# --------------------------------------------------
+# Compiled Model
+# --------------------------------------------------
+class CompiledSymptomModel:
+    """
+    Dense form of a condition -> {symptom: weight} table.
+
+    - `weights`: (conditions x symptoms) matrix
+    - `symptom_index`: symptom -> column
+    - `normalisers`: per-condition max possible score (row sums)
+    - `normalizer`: maps free-text input onto `symptoms`
+    """
+
+    def __init__(
+        self,
+        conditions: List[str],
+        symptoms: List[str],
+        weights: np.ndarray,
+        high_risk_symptoms,
+        version: str = "unversioned",
+        synonyms: Dict[str, str] | None = None,
+    ):
+        if weights.shape != (len(conditions), len(symptoms)):
+            raise ValueError(
+                f"weights shape {weights.shape} does not match "
+                f"{len(conditions)} conditions x {len(symptoms)} symptoms"
+            )
+
+        self.version = str(version)
+        self.conditions: List[str] = list(conditions)
+        self.symptoms: List[str] = list(symptoms)
+        self.symptom_index: Dict[str, int] = {s: i for i, s in enumerate(self.symptoms)}
+        self.high_risk_symptoms = frozenset(high_risk_symptoms)
+        self.weights = weights
+
+        normalisers = np.asarray(weights.sum(axis=1), dtype=np.float64)
+        # Conditions without weights score 0 instead of dividing by zero
+        self.normalisers = np.where(normalisers > 0, normalisers, np.inf)
+
+        self.synonyms: Dict[str, str] = dict(synonyms or {})
+        self.normalizer = SymptomNormalizer(self.symptoms, self.synonyms)
+
+    @classmethod
+    def from_weights(
+        cls,
+        condition_weights: Dict[str, Dict[str, float]],
+        high_risk_symptoms,
+        version: str = "unversioned",
+        synonyms: Dict[str, str] | None = None,
+    ) -> "CompiledSymptomModel":
+        conditions = list(condition_weights)
+        symptoms = sorted(
+            {symptom for weights in condition_weights.values() for symptom in weights}
+        )
+        index = {s: i for i, s in enumerate(symptoms)}
+
+        matrix = np.zeros((len(conditions), len(symptoms)), dtype=np.float64)
+        for row, weights in enumerate(condition_weights.values()):
+            for symptom, weight in weights.items():
+                matrix[row, index[symptom]] = weight
+
+        return cls(conditions, symptoms, matrix, high_risk_symptoms, version, synonyms)
+
+    def columns(self, symptoms: List[str]) -> List[int]:
+        """Column of every known symptom (repeats kept, unknowns dropped)."""
+        index = self.symptom_index
+        return [index[s] for s in symptoms if s in index]
+
+    def score(self, symptoms: List[str]) -> np.ndarray:
+        cols = self.columns(symptoms)
+        if not cols:
+            return np.zeros(len(self.conditions))
+        return self.weights[:, cols].sum(axis=1) / self.normalisers
+
+    def score_batch(self, batch: List[List[str]]) -> np.ndarray:
+        """Score many symptom lists with one (batch x symptoms) @ (symptoms x conditions)."""
+        counts = np.zeros((len(batch), len(self.symptoms)), dtype=np.float64)
+        for row, symptoms in enumerate(batch):
+            np.add.at(counts[row], self.columns(symptoms), 1.0)
+        return (counts @ self.weights.T) / self.normalisers
+
+
+# --------------------------------------------------
+# Loading / Saving
+# --------------------------------------------------
+def load_knowledge_base(path) -> CompiledSymptomModel:
+    path = Path(path)
+
+    if path.is_dir():
+        meta = json.loads((path / "kb.json").read_text(encoding="utf-8"))
+        weights = np.load(path / "weights.npy", mmap_mode="r")
+        return CompiledSymptomModel(
+            meta["conditions"],
+            meta["symptoms"],
+            weights,
+            meta.get("high_risk_symptoms", []),
+            meta.get("version", "unversioned"),
+            meta.get("synonyms"),
+        )
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return CompiledSymptomModel.from_weights(
+        data["conditions"],
+        data.get("high_risk_symptoms", []),
+        data.get("version", "unversioned"),
+        data.get("synonyms"),
+    )
+
+
+def save_binary_knowledge_base(model: CompiledSymptomModel, directory):
+    """Write `model` in the directory (memory-mappable) format."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    np.save(directory / "weights.npy", np.ascontiguousarray(model.weights, dtype=np.float64))
+    meta = {
+        "version": model.version,
+        "conditions": model.conditions,
+        "symptoms": model.symptoms,
+        "high_risk_symptoms": sorted(model.high_risk_symptoms),
+        "synonyms": model.synonyms,
+    }
+    (directory / "kb.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+# --------------------------------------------------
+# Active Model + Hot Reload
+# --------------------------------------------------
+def _kb_path() -> Path:
+    return Path(settings.SYMPTOM_KB_PATH) if settings.SYMPTOM_KB_PATH else DEFAULT_KB_PATH
+
+
+def _kb_mtime(path: Path) -> float:
+    if path.is_dir():
+        return max(
+            os.stat(path / name).st_mtime for name in ("kb.json", "weights.npy")
+        )
+    return os.stat(path).st_mtime
+
+
+_reload_lock = threading.Lock()
+_active_path = _kb_path()
+_active_mtime = _kb_mtime(_active_path)
+_active_model = load_knowledge_base(_active_path)
+
+
+def get_model() -> CompiledSymptomModel:
+    return _active_model
+
+
+def reload_knowledge_base(path=None) -> CompiledSymptomModel:
+    """
+    Load and compile a knowledge base, then swap it in. The previous model
+    keeps serving until the new one is fully built; a failed load leaves
+    it in place and re-raises.
+    """
+    global _active_model, _active_path, _active_mtime
+
+    with _reload_lock:
+        path = Path(path) if path else _active_path
+        mtime = _kb_mtime(path)
+        model = load_knowledge_base(path)
+
+        _active_model, _active_path, _active_mtime = model, path, mtime
+
+    logger.info("Loaded symptom knowledge base %s (version %s)", path, model.version)
+    return model
+
+
+async def watch_knowledge_base(interval: float):
+    """Poll the active file's mtime and reload in a worker thread when it changes."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if _kb_mtime(_active_path) != _active_mtime:
+                await asyncio.to_thread(reload_knowledge_base)
+        except Exception:
+            logger.exception("Symptom knowledge base reload failed; keeping version %s",
+                             _active_model.version)
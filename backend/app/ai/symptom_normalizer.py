@@ -0,0 +1,125 @@
+"""
+Symptom Normalisation
+---------------------
+Maps free-text symptoms onto the knowledge base vocabulary before
+scoring:
+
+1. cleanup: lowercase, `-`/`_` to spaces, collapse whitespace
+2. exact match against the vocabulary or the synonym map
+3. bounded edit-distance match against a trie of vocabulary + synonyms
+
+Resolved terms are kept in an LRU cache, so repeated inputs never reach
+the trie. A normaliser is built together with its compiled model, which
+means a knowledge base reload also starts a fresh cache.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_SEPARATORS = re.compile(r"[\s\-_]+")
+
+
+def clean_symptom(symptom: str) -> str:
+    return _SEPARATORS.sub(" ", symptom.lower()).strip()
+
+
+def max_edits(term: str) -> int:
+    """Typo budget by length: short words must match exactly."""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 6:
+        return 1
+    return 2
+
+
+class _TrieNode:
+    __slots__ = ("children", "term")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.term: Optional[str] = None
+
+
+class SymptomTrie:
+    """Character trie supporting Levenshtein search with a distance bound."""
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.root = _TrieNode()
+        for term in terms:
+            self.insert(term)
+
+    def insert(self, term: str):
+        node = self.root
+        for char in term:
+            node = node.children.setdefault(char, _TrieNode())
+        node.term = term
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """All (distance, term) pairs within `max_distance` of `word`."""
+        results: List[Tuple[int, str]] = []
+        first_row = list(range(len(word) + 1))
+
+        for char, child in self.root.children.items():
+            self._search(child, char, word, first_row, max_distance, results)
+        return results
+
+    def _search(self, node, char, word, previous_row, max_distance, results):
+        row = [previous_row[0] + 1]
+        for col in range(1, len(word) + 1):
+            row.append(min(
+                row[col - 1] + 1,                                  # insertion
+                previous_row[col] + 1,                             # deletion
+                previous_row[col - 1] + (word[col - 1] != char),   # substitution
+            ))
+
+        if node.term is not None and row[-1] <= max_distance:
+            results.append((row[-1], node.term))
+
+        # Prune: no extension of this prefix can get back under the bound
+        if min(row) <= max_distance:
+            for next_char, child in node.children.items():
+                self._search(child, next_char, word, row, max_distance, results)
+
+
+class SymptomNormalizer:
+    def __init__(
+        self,
+        vocabulary: Iterable[str],
+        synonyms: Optional[Dict[str, str]] = None,
+        cache_size: int = 4096,
+    ):
+        self.vocabulary = frozenset(vocabulary)
+        # synonym -> canonical symptom, keys cleaned the same way as input
+        self.synonyms = {
+            clean_symptom(alias): canonical
+            for alias, canonical in (synonyms or {}).items()
+        }
+        self.trie = SymptomTrie(self.vocabulary | set(self.synonyms))
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _canonical(self, term: str) -> Optional[str]:
+        if term in self.vocabulary:
+            return term
+        return self.synonyms.get(term)
+
+    def _resolve(self, symptom: str) -> str:
+        term = clean_symptom(symptom)
+
+        exact = self._canonical(term)
+        if exact is not None:
+            return exact
+
+        budget = max_edits(term)
+        if budget:
+            matches = self.trie.search(term, budget)
+            if matches:
+                # Closest match wins; ties broken alphabetically for determinism
+                _, best = min(matches)
+                return self._canonical(best)
+
+        # Unknown symptoms pass through cleaned; they score zero
+        return term
+
+    def normalize(self, symptoms: List[str]) -> List[str]:
+        return [self.resolve(symptom) for symptom in symptoms]
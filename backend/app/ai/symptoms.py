@@ -6,109 +6,58 @@ Current implementation:
 - Deterministic, explainable, real-time
 - Fully replaceable with trained ML models later
 
+The symptom -> condition weights live in a versioned knowledge base
+file (see `app.ai.symptom_kb`). Input is first mapped onto the
+vocabulary (synonyms, typos; see `app.ai.symptom_normalizer`), then
+compiled into a dense condition x symptom
+NumPy matrix, so scoring a request is a column gather + row sum and
+scoring a batch is one matrix multiply, regardless of how large the
+condition catalog grows.
+
+Inputs are canonicalised (normalised, deduplicated, sorted) before
+scoring, so equivalent symptom sets share one entry in the result cache
+(`result_cache`), which is keyed on the knowledge base version.
+
 Future upgrade:
 - Replace `analyze_symptoms()` internals with
   BERT / ONNX / Torch model inference
 """
 
-from typing import List, Dict
-
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple
 
-# --------------------------------------------------
-# Symptom → Condition Weight Matrix (acts like model)
-# --------------------------------------------------
-CONDITION_WEIGHTS: Dict[str, Dict[str, float]] = {
-    "Viral Infection": {
-        "fever": 0.8,
-        "fatigue": 0.6,
-        "body aches": 0.7,
-        "cough": 0.5,
-        "sore throat": 0.4
-    },
-    "Seasonal Flu": {
-        "fever": 0.9,
-        "cough": 0.8,
-        "fatigue": 0.7,
-        "headache": 0.6,
-        "body aches": 0.8
-    },
-    "Respiratory Issue": {
-        "shortness of breath": 0.9,
-        "cough": 0.6,
-        "chest pain": 0.7
-    },
-    "Cardiac Risk": {
-        "chest pain": 1.0,
-        "shortness of breath": 0.9,
-        "dizziness": 0.6,
-        "fatigue": 0.4
-    },
-    "Gastrointestinal Issue": {
-        "nausea": 0.7,
-        "vomiting": 0.8,
-        "diarrhea": 0.8,
-        "stomach pain": 0.6,
-        "loss of appetite": 0.5
-    }
-}
+import numpy as np
 
-HIGH_RISK_SYMPTOMS = {
-    "chest pain",
-    "shortness of breath"
-}
+from app.ai.symptom_kb import CompiledSymptomModel, get_model
+from app.config import settings
 
 
 # --------------------------------------------------
 # Core AI Inference Function
 # --------------------------------------------------
-def analyze_symptoms(symptoms: List[str]) -> Dict:
-    """
-    Perform real-time symptom analysis.
+def canonical_symptoms(model: CompiledSymptomModel, symptoms: List[str]) -> Tuple[str, ...]:
+    """Normalised, deduplicated, sorted symptom set."""
+    return tuple(sorted({s for s in model.normalizer.normalize(symptoms) if s}))
 
-    Args:
-        symptoms (List[str]): list of symptoms from frontend
-
-    Returns:
-        Dict: structured AI response
-    """
-
-    # Normalize symptoms
-    symptoms = [s.lower().strip() for s in symptoms]
-
-    condition_scores: Dict[str, float] = {}
-
-    # ---- Inference (ML-style weighted scoring) ----
-    for condition, weights in CONDITION_WEIGHTS.items():
-        score = 0.0
-        max_possible = sum(weights.values())
-
-        for symptom in symptoms:
-            if symptom in weights:
-                score += weights[symptom]
-
-        normalized_score = score / max_possible if max_possible > 0 else 0.0
-        condition_scores[condition] = round(normalized_score, 2)
 
+def _build_response(model: CompiledSymptomModel, symptoms: List[str], scores: np.ndarray) -> Dict:
     # ---- Rank top conditions ----
-    ranked_conditions = sorted(
-        condition_scores.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
-
-    results = [
-        {
-            "name": name,
-            "confidence": confidence
-        }
-        for name, confidence in ranked_conditions
-        if confidence > 0
-    ][:3]
+    condition_scores = np.round(scores, 2)
+    ranked = np.argsort(-condition_scores, kind="stable")
+
+    results = []
+    for row in ranked[:3]:
+        confidence = float(condition_scores[row])
+        if confidence <= 0:
+            break
+        results.append({"name": model.conditions[row], "confidence": confidence})
 
     # ---- Risk Assessment ----
     risk_level = "Low"
 
-    if any(symptom in HIGH_RISK_SYMPTOMS for symptom in symptoms):
+    if any(symptom in model.high_risk_symptoms for symptom in symptoms):
         risk_level = "High"
     elif len(symptoms) >= 3:
         risk_level = "Medium"
@@ -127,3 +76,138 @@ def analyze_symptoms(symptoms: List[str]) -> Dict:
         "risk_level": risk_level,
         "advice": advice
     }
+
+
+def analyze_symptoms(symptoms: List[str]) -> Dict:
+    """
+    Perform real-time symptom analysis.
+
+    Args:
+        symptoms (List[str]): list of symptoms from frontend
+
+    Returns:
+        Dict: structured AI response
+    """
+    model = get_model()
+    symptoms = list(canonical_symptoms(model, symptoms))
+    return _build_response(model, symptoms, model.score(symptoms))
+
+
+def analyze_symptoms_batch(batch: List[List[str]]) -> List[Dict]:
+    """
+    Score many symptom lists in a single matrix multiply.
+
+    Returns one response per input, in the same order as `analyze_symptoms`.
+    """
+    if not batch:
+        return []
+
+    model = get_model()
+    batch = [list(canonical_symptoms(model, symptoms)) for symptoms in batch]
+    scores = model.score_batch(batch)
+    return [
+        _build_response(model, symptoms, row)
+        for symptoms, row in zip(batch, scores)
+    ]
+
+
+# --------------------------------------------------
+# Result Cache
+# --------------------------------------------------
+class SymptomResultCache:
+    """
+    Size-bounded LRU of analysis results keyed on the canonical symptom
+    set. Entries belong to one knowledge base version; the cache empties
+    itself the first time it sees a newer model.
+
+    Cached results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.version = None
+        self._entries: "OrderedDict[Tuple[str, ...], Tuple[Dict, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def etag(version: str, key: Tuple[str, ...]) -> str:
+        digest = hashlib.sha1("\x1f".join((version, *key)).encode("utf-8")).hexdigest()
+        return f'"{digest}"'
+
+    def _lookup(self, model: CompiledSymptomModel, key: Tuple[str, ...]):
+        with self._lock:
+            if self.version != model.version:
+                self._entries.clear()
+                self.version = model.version
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def _store(self, model: CompiledSymptomModel, key: Tuple[str, ...], result: Dict) -> Tuple[Dict, str]:
+        entry = (result, self.etag(model.version, key))
+        with self._lock:
+            if self.max_size > 0 and self.version == model.version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def analyze(self, symptoms: List[str]) -> Tuple[Dict, str]:
+        """Cached `analyze_symptoms`; returns (result, etag)."""
+        model = get_model()
+        key = canonical_symptoms(model, symptoms)
+
+        entry = self._lookup(model, key)
+        if entry is not None:
+            return entry
+
+        canonical = list(key)
+        result = _build_response(model, canonical, model.score(canonical))
+        return self._store(model, key, result)
+
+    def analyze_batch(self, batch: List[List[str]]) -> List[Tuple[Dict, str]]:
+        """
+        Cached `analyze_symptoms_batch`: cache hits are served directly and
+        all misses (deduplicated) are scored in one matrix multiply.
+        """
+        model = get_model()
+        keys = [canonical_symptoms(model, symptoms) for symptoms in batch]
+
+        entries: Dict[Tuple[str, ...], Tuple[Dict, str]] = {}
+        misses: Dict[Tuple[str, ...], None] = {}
+        for key in keys:
+            if key in entries or key in misses:
+                continue
+            entry = self._lookup(model, key)
+            if entry is not None:
+                entries[key] = entry
+            else:
+                misses[key] = None
+
+        if misses:
+            scores = model.score_batch([list(key) for key in misses])
+            for key, row in zip(misses, scores):
+                entries[key] = self._store(model, key, _build_response(model, list(key), row))
+
+        return [entries[key] for key in keys]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+result_cache = SymptomResultCache(settings.SYMPTOM_CACHE_SIZE)
@@ -0,0 +1,401 @@
+"""
+Vitals Ingestion
+----------------
+Readings are validated in the request handler, appended to an in-process
+buffer and written by a background task with `insert_many(ordered=False)`
+into the `vitals` time-series collection:
+
+    {"timestamp": ..., "meta": {"patient_id": ..., "type": ...}, "value": ...}
+
+Every flush also folds the written readings into `vitals_rollups`:
+per patient, vital type and minute/hour/day bucket it keeps count, sum,
+min and max, maintained with upserted `$inc`/`$min`/`$max`, so range
+queries over long windows read a few hundred rollup documents instead of
+every raw reading. The `$inc`s cannot be safely retried, so when a rollup
+write fails the affected patient/type/day is marked dirty and rebuilt
+from the raw readings on the next flush (`rebuild_rollups`).
+
+Every reading gets its `_id` when it is created. If a write fails
+ambiguously (e.g. a network error), the batch is requeued and its ids are
+remembered. The retry first looks those ids up and skips the readings
+already stored, so they are neither duplicated nor rolled up twice.
+
+A flush happens every `flush_interval` seconds, or as soon as
+`flush_size` readings are waiting. When `max_size` readings are already
+buffered, new readings are refused (`VitalsBufferFull`) so callers can
+back off instead of growing memory without bound.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.config import settings
+from app.db.mongodb import get_db
+
+logger = logging.getLogger(__name__)
+
+VITALS_COLLECTION = "vitals"
+ROLLUPS_COLLECTION = "vitals_rollups"
+
+# Finest first
+ROLLUP_RESOLUTIONS: Dict[str, timedelta] = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Values a device can plausibly report (inclusive); anything outside is
+# rejected at ingestion so it never reaches rollups or anomaly baselines
+VITAL_RANGES: Dict[str, Tuple[float, float]] = {
+    "heart_rate": (20, 300),          # bpm
+    "systolic_bp": (40, 300),         # mmHg
+    "diastolic_bp": (20, 200),        # mmHg
+    "spo2": (50, 100),                # %
+    "temperature": (25.0, 45.0),      # C
+    "respiratory_rate": (2, 80),      # breaths/min
+    "glucose": (10, 1000),            # mg/dL
+    "weight": (0.5, 500),             # kg
+    "steps": (0, 200_000),
+}
+
+VITAL_TYPES = set(VITAL_RANGES)
+
+
+class VitalsBufferFull(Exception):
+    pass
+
+
+def to_utc_naive(timestamp: datetime | None) -> datetime:
+    """Store timestamps as naive UTC, like the rest of the collections."""
+    if timestamp is None:
+        return datetime.utcnow()
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def make_vitals_doc(patient_id: str, vital_type: str, value: float, timestamp: datetime | None) -> Dict:
+    return {
+        "_id": ObjectId(),
+        "timestamp": to_utc_naive(timestamp),
+        "meta": {"patient_id": patient_id, "type": vital_type},
+        "value": float(value),
+    }
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    if resolution == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown resolution {resolution}")
+
+
+def rollup_updates(docs: List[Dict], replace: bool = False) -> List[UpdateOne]:
+    """
+    Pre-aggregate a batch in memory, then one upsert per touched bucket.
+    With `replace` the buckets are overwritten instead of incremented.
+    """
+    buckets: Dict[Tuple[str, str, str, datetime], List[float]] = {}
+
+    for doc in docs:
+        meta = doc["meta"]
+        value = doc["value"]
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (meta["patient_id"], meta["type"], resolution,
+                   bucket_start(doc["timestamp"], resolution))
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = [1, value, value, value]
+            else:
+                agg[0] += 1
+                agg[1] += value
+                agg[2] = min(agg[2], value)
+                agg[3] = max(agg[3], value)
+
+    def change(count, total, low, high):
+        if replace:
+            return {"$set": {"count": count, "sum": total, "min": low, "max": high}}
+        return {"$inc": {"count": count, "sum": total},
+                "$min": {"min": low},
+                "$max": {"max": high}}
+
+    return [
+        UpdateOne(
+            {"patient_id": patient_id, "type": vital_type,
+             "resolution": resolution, "bucket": bucket},
+            change(*agg),
+            upsert=True,
+        )
+        for (patient_id, vital_type, resolution, bucket), agg in buckets.items()
+    ]
+
+
+async def rebuild_rollups(db, patient_id: str, vital_type: str, day: datetime) -> int:
+    """
+    Recompute every rollup bucket of one patient, type and day from the
+    raw readings. Returns the number of readings folded in.
+    """
+    start = bucket_start(day, "day")
+    cursor = db[VITALS_COLLECTION].find(
+        {"meta.patient_id": patient_id, "meta.type": vital_type,
+         "timestamp": {"$gte": start, "$lt": start + ROLLUP_RESOLUTIONS["day"]}},
+        {"_id": 0, "timestamp": 1, "meta": 1, "value": 1},
+    )
+    docs = await cursor.to_list(length=None)
+    if docs:
+        await db[ROLLUPS_COLLECTION].bulk_write(rollup_updates(docs, replace=True), ordered=False)
+    return len(docs)
+
+
+# --------------------------------------------------
+# Range queries
+# --------------------------------------------------
+def choose_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """Finest rollup whose bucket count over the window fits `max_points`."""
+    span = end - start
+    for resolution, width in ROLLUP_RESOLUTIONS.items():
+        if span / width <= max_points:
+            return resolution
+    return "day"
+
+
+async def query_vitals_range(
+    db,
+    patient_id: str,
+    vital_type: str,
+    start: datetime,
+    end: datetime,
+    resolution: str,
+    max_points: int,
+) -> Tuple[List[Dict], bool]:
+    """
+    Points in [start, end) at `resolution` ("raw" or a rollup name).
+    Returns (points, truncated); at most `max_points` points are read.
+    """
+    if resolution == "raw":
+        cursor = (
+            db[VITALS_COLLECTION]
+            .find(
+                {"meta.patient_id": patient_id, "meta.type": vital_type,
+                 "timestamp": {"$gte": start, "$lt": end}},
+                {"_id": 0, "timestamp": 1, "value": 1},
+            )
+            .sort("timestamp", 1)
+            .limit(max_points + 1)
+        )
+        docs = await cursor.to_list(length=max_points + 1)
+        points = [{"timestamp": d["timestamp"], "value": d["value"]} for d in docs]
+
+    else:
+        cursor = (
+            db[ROLLUPS_COLLECTION]
+            .find(
+                {"patient_id": patient_id, "type": vital_type, "resolution": resolution,
+                 "bucket": {"$gte": bucket_start(start, resolution), "$lt": end}},
+                {"_id": 0, "bucket": 1, "count": 1, "sum": 1, "min": 1, "max": 1},
+            )
+            .sort("bucket", 1)
+            .limit(max_points + 1)
+        )
+        docs = await cursor.to_list(length=max_points + 1)
+        points = [
+            {
+                "timestamp": d["bucket"],
+                "count": d["count"],
+                "min": d["min"],
+                "max": d["max"],
+                "mean": d["sum"] / d["count"],
+            }
+            for d in docs
+        ]
+
+    truncated = len(points) > max_points
+    return points[:max_points], truncated
+
+
+class VitalsBuffer:
+    def __init__(self, max_size: int, flush_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._pending: List[Dict] = []
+        # Ids of readings whose insert may or may not have landed
+        self._unconfirmed: Set[ObjectId] = set()
+        # (patient_id, type, day) whose rollups need rebuilding
+        self._dirty: Set[Tuple[str, str, datetime]] = set()
+        self._flush_now = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.write_errors = 0
+        self.dropped = 0
+        self.rollup_errors = 0
+        self.rollup_rebuilds = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, docs: List[Dict]):
+        """Queue readings for the next flush; all-or-nothing."""
+        if len(self._pending) + len(docs) > self.max_size:
+            self.rejected += len(docs)
+            raise VitalsBufferFull()
+
+        self._pending.extend(docs)
+        self.accepted += len(docs)
+        if len(self._pending) >= self.flush_size:
+            self._flush_now.set()
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[: self.flush_size]
+                del self._pending[: self.flush_size]
+                await self._write(batch)
+            if self._dirty:
+                await self._rebuild_dirty()
+
+    async def _rebuild_dirty(self):
+        db = get_db()
+        for key in list(self._dirty):
+            try:
+                await rebuild_rollups(db, *key)
+            except PyMongoError:
+                logger.exception("Vitals rollup rebuild failed; %d days left", len(self._dirty))
+                return
+            self._dirty.discard(key)
+            self.rollup_rebuilds += 1
+
+    async def _already_stored(self, db, batch: List[Dict]) -> List[Dict]:
+        """Readings of a retried batch that an earlier, failed attempt wrote."""
+        ids = [doc["_id"] for doc in batch if doc["_id"] in self._unconfirmed]
+        if not ids:
+            return []
+        timestamps = [doc["timestamp"] for doc in batch]
+        cursor = db[VITALS_COLLECTION].find(
+            {"_id": {"$in": ids},
+             "timestamp": {"$gte": min(timestamps), "$lte": max(timestamps)}},
+            {"_id": 1},
+        )
+        stored = {doc["_id"] async for doc in cursor}
+        self._unconfirmed.difference_update(ids)
+        return [doc for doc in batch if doc["_id"] in stored]
+
+    async def _write(self, batch: List[Dict]):
+        db = get_db()
+        stored = []
+        try:
+            stored = await self._already_stored(db, batch)
+            if stored:
+                stored_ids = {doc["_id"] for doc in stored}
+                batch = [doc for doc in batch if doc["_id"] not in stored_ids]
+            written = batch
+            if batch:
+                await db[VITALS_COLLECTION].insert_many(batch, ordered=False)
+        except BulkWriteError as exc:
+            # ordered=False: everything but the failed documents was written
+            failed = {err["index"] for err in exc.details.get("writeErrors", [])}
+            written = [doc for i, doc in enumerate(batch) if i not in failed]
+            self.write_errors += len(failed)
+            logger.warning("Dropped %d invalid vitals readings", len(failed))
+        except PyMongoError:
+            # Transient failure: part of the batch may have been written, so
+            # remember the ids and put the batch back if there is room
+            self.write_errors += 1
+            batch = stored + batch if stored else batch
+            if len(self._pending) + len(batch) <= self.max_size:
+                self._unconfirmed.update(doc["_id"] for doc in batch)
+                self._pending[:0] = batch
+                logger.exception("Vitals flush failed; %d readings requeued", len(batch))
+            else:
+                self.dropped += len(batch)
+                logger.exception("Vitals flush failed; buffer full, %d readings dropped", len(batch))
+            raise
+
+        # Stored by an earlier attempt that failed before its rollup
+        written = stored + written
+        self.written += len(written)
+        if not written:
+            return
+
+        try:
+            await db[ROLLUPS_COLLECTION].bulk_write(rollup_updates(written), ordered=False)
+        except PyMongoError:
+            # Raw readings are safe; some buckets may have been incremented,
+            # so rebuild the touched days rather than retrying the $inc
+            self.rollup_errors += 1
+            self._dirty.update(
+                (doc["meta"]["patient_id"], doc["meta"]["type"],
+                 bucket_start(doc["timestamp"], "day"))
+                for doc in written
+            )
+            logger.exception("Vitals rollup update failed for %d readings", len(written))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+
+            try:
+                await self.flush()
+            except PyMongoError:
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self):
+        if self._task is None:
+            # Bind the primitives to the running loop
+            self._flush_now = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except PyMongoError:
+            logger.error("Lost %d buffered vitals readings on shutdown", len(self._pending))
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._pending),
+            "max_size": self.max_size,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "write_errors": self.write_errors,
+            "dropped": self.dropped,
+            "unconfirmed": len(self._unconfirmed),
+            "rollup_errors": self.rollup_errors,
+            "rollup_rebuilds": self.rollup_rebuilds,
+            "rollups_dirty": len(self._dirty),
+        }
+
+
+vitals_buffer = VitalsBuffer(
+    max_size=settings.VITALS_BUFFER_MAX_SIZE,
+    flush_size=settings.VITALS_FLUSH_SIZE,
+    flush_interval=settings.VITALS_FLUSH_INTERVAL_SECONDS,
+)
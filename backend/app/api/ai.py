@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from app.api.ai_proxy import router as ai_proxy_router
+from app.api.chatbot import router as chatbot_router
+
+# All AI-backed endpoints, mounted under /ai
+router = APIRouter(prefix="/ai")
+
+router.include_router(chatbot_router)
+router.include_router(ai_proxy_router)
@@ -0,0 +1,390 @@
+"""
+AI Proxy
+--------
+Outbound client for upstream AI services (named in
+`settings.AI_UPSTREAMS`), plus a small router exposing it.
+
+- one long-lived `aiohttp.ClientSession` for the whole process, with a
+  bounded keep-alive connection pool, so calls reuse warm connections
+  instead of paying TCP/TLS setup every time
+- request coalescing: identical in-flight calls (same upstream, path and
+  payload) share one upstream request
+- per-upstream concurrency limit (semaphore) and per-attempt timeout
+- circuit breaker per upstream: after `breaker_failures` consecutive
+  failures calls fail fast for `breaker_reset` seconds, then one trial
+  call decides whether to close it again
+- hedged retries: if an attempt has not answered within `hedge_delay`
+  and the upstream has a free slot, a second identical attempt races it;
+  failed attempts are retried with exponential backoff
+
+Upstream calls are treated as idempotent (inference requests), which is
+what makes coalescing, hedging and retrying safe.
+
+An upstream URL of `stub://` selects `StubTransport`, an in-process fake
+with configurable latency and failure rate, for local runs and tests.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.config import settings
+from app.core.deps import get_current_user
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    def __init__(self, status: int, detail: str, retryable: bool = True):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retryable = retryable
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(503, f"Upstream {upstream} is unavailable", retryable=False)
+        self.retry_after = retry_after
+
+
+# --------------------------------------------------
+# Circuit Breaker
+# --------------------------------------------------
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def record_cancelled(self):
+        """The call was abandoned, not answered: free the half-open trial slot."""
+        self._trial_running = False
+
+
+# --------------------------------------------------
+# Transports
+# --------------------------------------------------
+class HttpTransport:
+    def __init__(self, base_url: str, client: "AIProxyClient"):
+        self.base_url = base_url.rstrip("/")
+        self.client = client
+
+    async def send(self, path: str, payload: dict) -> dict:
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        async with self.client.session.post(url, json=payload) as resp:
+            if resp.status >= 400:
+                text = await resp.text()
+                raise UpstreamError(resp.status, text[:200], retryable=resp.status >= 500)
+            return await resp.json(content_type=None)
+
+
+class StubTransport:
+    """Deterministic in-process upstream."""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    async def send(self, path: str, payload: dict) -> dict:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise UpstreamError(503, "stub upstream failure")
+        prompt = str(payload.get("prompt", ""))
+        return {"upstream": "stub", "path": path, "output": f"Stub response to: {prompt}"}
+
+
+# --------------------------------------------------
+# Client
+# --------------------------------------------------
+class Upstream:
+    def __init__(self, name: str, transport, max_concurrency: int, breaker: CircuitBreaker):
+        self.name = name
+        self.transport = transport
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = breaker
+
+        self.active = 0
+        self.requests = 0
+        self.attempts = 0
+        self.hedges = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+
+class AIProxyClient:
+    def __init__(
+        self,
+        upstreams: Dict[str, str],
+        pool_size: int,
+        pool_per_host: int,
+        keepalive: float,
+        connect_timeout: float,
+        timeout: float,
+        upstream_concurrency: int,
+        max_attempts: int,
+        hedge_delay: float,
+        breaker_failures: int,
+        breaker_reset: float,
+        stub_latency: float = 0.0,
+        stub_failure_rate: float = 0.0,
+        backoff_base: float = 0.1,
+        backoff_max: float = 2.0,
+    ):
+        self.pool_size = pool_size
+        self.pool_per_host = pool_per_host
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.hedge_delay = hedge_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.upstreams: Dict[str, Upstream] = {}
+        for name, url in upstreams.items():
+            if url.startswith("stub://"):
+                transport = StubTransport(stub_latency, stub_failure_rate)
+            else:
+                transport = HttpTransport(url, self)
+            self.upstreams[name] = Upstream(
+                name, transport, upstream_concurrency,
+                CircuitBreaker(breaker_failures, breaker_reset),
+            )
+
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self.coalesced = 0
+
+    # ---- Lifecycle ----
+    async def start(self):
+        # Bind the semaphores to the running loop
+        for upstream in self.upstreams.values():
+            upstream.semaphore = asyncio.Semaphore(upstream.max_concurrency)
+
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_per_host,
+                keepalive_timeout=self.keepalive,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout),
+            )
+
+    async def stop(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # ---- Attempts ----
+    async def _attempt(self, upstream: Upstream, path: str, payload: dict) -> dict:
+        async with upstream.semaphore:
+            upstream.attempts += 1
+            upstream.active += 1
+            try:
+                return await asyncio.wait_for(
+                    upstream.transport.send(path, payload), self.timeout
+                )
+            except asyncio.TimeoutError:
+                raise UpstreamError(504, f"Upstream {upstream.name} timed out")
+            except aiohttp.ClientError as exc:
+                raise UpstreamError(502, f"Upstream {upstream.name} unreachable: {exc}")
+            finally:
+                upstream.active -= 1
+
+    async def _hedged(self, upstream: Upstream, path: str, payload: dict) -> dict:
+        """One attempt, raced by a second one if the first is slow."""
+        pending = {asyncio.create_task(self._attempt(upstream, path, payload))}
+        try:
+            if self.hedge_delay > 0:
+                done, pending = await asyncio.wait(pending, timeout=self.hedge_delay)
+                if done:
+                    return done.pop().result()
+                # Only hedge into spare capacity, never queue behind others
+                if not upstream.semaphore.locked():
+                    upstream.hedges += 1
+                    pending.add(asyncio.create_task(self._attempt(upstream, path, payload)))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, upstream: Upstream, path: str, payload: dict) -> dict:
+        error = None
+        for attempt in range(self.max_attempts):
+            if not upstream.breaker.allow():
+                upstream.short_circuited += 1
+                raise CircuitOpenError(upstream.name, upstream.breaker.retry_after())
+            try:
+                result = await self._hedged(upstream, path, payload)
+            except UpstreamError as exc:
+                if not exc.retryable:
+                    # The upstream answered (e.g. 4xx), so it is healthy
+                    upstream.breaker.record_success()
+                    raise
+                upstream.failures += 1
+                upstream.breaker.record_failure()
+                error = exc
+            except asyncio.CancelledError:
+                upstream.breaker.record_cancelled()
+                raise
+            except BaseException:
+                # e.g. an unparseable body: count it, or a half-open
+                # breaker would wait for this trial forever
+                upstream.failures += 1
+                upstream.breaker.record_failure()
+                raise
+            else:
+                upstream.breaker.record_success()
+                return result
+
+            if attempt + 1 < self.max_attempts:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        raise error
+
+    # ---- Public API ----
+    async def request(self, upstream_name: str, path: str, payload: dict) -> dict:
+        upstream = self.upstreams.get(upstream_name)
+        if upstream is None:
+            raise UpstreamError(404, f"Unknown upstream {upstream_name}", retryable=False)
+        upstream.requests += 1
+
+        key = (upstream_name, path, json.dumps(payload, sort_keys=True, default=str))
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._call(upstream, path, payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+
+        # shield: one caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()   # mark retrieved even if every caller went away
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "upstreams": {
+                name: {
+                    "breaker": u.breaker.state,
+                    "active": u.active,
+                    "requests": u.requests,
+                    "attempts": u.attempts,
+                    "hedges": u.hedges,
+                    "failures": u.failures,
+                    "short_circuited": u.short_circuited,
+                }
+                for name, u in self.upstreams.items()
+            },
+        }
+
+
+ai_proxy = AIProxyClient(
+    upstreams=settings.AI_UPSTREAMS,
+    pool_size=settings.AI_PROXY_POOL_SIZE,
+    pool_per_host=settings.AI_PROXY_POOL_PER_HOST,
+    keepalive=settings.AI_PROXY_KEEPALIVE_SECONDS,
+    connect_timeout=settings.AI_PROXY_CONNECT_TIMEOUT_SECONDS,
+    timeout=settings.AI_PROXY_TIMEOUT_SECONDS,
+    upstream_concurrency=settings.AI_PROXY_UPSTREAM_CONCURRENCY,
+    max_attempts=settings.AI_PROXY_MAX_ATTEMPTS,
+    hedge_delay=settings.AI_PROXY_HEDGE_DELAY_SECONDS,
+    breaker_failures=settings.AI_PROXY_BREAKER_FAILURES,
+    breaker_reset=settings.AI_PROXY_BREAKER_RESET_SECONDS,
+    stub_latency=settings.AI_PROXY_STUB_LATENCY_SECONDS,
+    stub_failure_rate=settings.AI_PROXY_STUB_FAILURE_RATE,
+)
+
+
+# -----------------------------------------------------------
+# Routes
+# -----------------------------------------------------------
+router = APIRouter(prefix="/proxy", tags=["AI Proxy"])
+
+
+@router.post("/{upstream}/infer")
+async def proxy_infer(
+    upstream: str,
+    payload: Dict[str, Any],
+    current_user: dict = Depends(get_current_user)
+):
+    """Forward an inference request to a configured upstream."""
+    try:
+        return await ai_proxy.request(upstream, settings.AI_PROXY_INFER_PATH, payload)
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=exc.detail,
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        )
+    except UpstreamError as exc:
+        status = exc.status if exc.status < 500 else (504 if exc.status == 504 else 502)
+        raise HTTPException(status_code=status, detail=exc.detail)
+
+
+@router.get("/status")
+async def proxy_status(current_user: dict = Depends(get_current_user)):
+    return ai_proxy.stats()
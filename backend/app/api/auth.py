@@ -1,17 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
 
 from app.db.mongodb import get_db
 from app.core.deps import get_current_user
+from app.core.security import hash_password_async, verify_password_async
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 # ----------- MODELS -----------
 
@@ -51,7 +49,7 @@ async def register_user(
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_pw = pwd_context.hash(payload.password)
+    hashed_pw = await hash_password_async(payload.password)
 
     new_user = {
         "email": payload.email,
@@ -95,7 +93,7 @@ async def login_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not pwd_context.verify(payload.password, user["password"]):
+    if not await verify_password_async(payload.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     token_data = {
@@ -0,0 +1,102 @@
+import json
+import logging
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.ai.chatbot_service import ChatbotBusy, chat_service
+from app.core.deps import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
+
+
+class ChatMessage(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str = Field(max_length=4000)
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1, max_length=2000)
+    history: List[ChatMessage] = Field(default_factory=list, max_length=20)
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="The assistant is busy, please retry shortly",
+        headers={"Retry-After": "2"},
+    )
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+# -----------------------------------------------------------
+# Streaming reply (Server-Sent Events)
+# -----------------------------------------------------------
+@router.post("/stream")
+async def chat_stream(
+    payload: ChatRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streams the reply as SSE: one `data: {"token": ...}` event per token,
+    then `event: done` (or `event: error` if generation fails midway).
+    """
+    history = [m.model_dump() for m in payload.history]
+
+    cached = chat_service.cached_answer(payload.message, history)
+    if cached is None and not chat_service.has_capacity():
+        raise _busy()
+
+    async def events():
+        if cached is not None:
+            for token in chat_service.replay(cached):
+                yield _sse({"token": token})
+            yield _sse({"cached": True}, event="done")
+            return
+
+        try:
+            async for token in chat_service.stream(payload.message, history):
+                yield _sse({"token": token})
+        except ChatbotBusy:
+            yield _sse({"detail": "The assistant is busy, please retry shortly"}, event="error")
+            return
+        except Exception:
+            logger.exception("Chatbot generation failed")
+            yield _sse({"detail": "Generation failed"}, event="error")
+            return
+        yield _sse({"cached": False}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -----------------------------------------------------------
+# Whole reply (non-streaming clients)
+# -----------------------------------------------------------
+@router.post("/")
+async def chat(
+    payload: ChatRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    history = [m.model_dump() for m in payload.history]
+
+    cached = chat_service.cached_answer(payload.message, history)
+    if cached is not None:
+        return {"reply": cached, "cached": True}
+
+    try:
+        tokens = [token async for token in chat_service.stream(payload.message, history)]
+    except ChatbotBusy:
+        raise _busy()
+    return {"reply": "".join(tokens), "cached": False}
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends
+
+from app.ai.gamification_service import WALLETS_COLLECTION
+from app.ai.vitals_service import ROLLUPS_COLLECTION
+from app.config import settings
+from app.core.rbac import RoleChecker
+from app.db.mongodb import get_routed_db
+from app.utils.helpers import serialize_doc, to_object_ids
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+RECENT_PRESCRIPTIONS = 5
+RECENT_SYMPTOM_CHECKS = 5
+
+
+# -----------------------------------------------------------
+# Sections (one query each, all run concurrently)
+# -----------------------------------------------------------
+async def _profile(db, user_id: str):
+    profile = await db.patient_profiles.find_one({"user_id": user_id}, {"_id": 0})
+    return profile
+
+
+async def _prescriptions(db, user_id: str):
+    cursor = (
+        db.prescriptions
+        .find({"patient_user_id": user_id})
+        .sort([("date", -1), ("_id", -1)])
+        .limit(RECENT_PRESCRIPTIONS)
+    )
+    return [serialize_doc(doc) for doc in await cursor.to_list(length=RECENT_PRESCRIPTIONS)]
+
+
+async def _family(db, user_id: str):
+    links = await db.family_links.find(
+        {"patient_user_id": user_id}, {"family_user_id": 1, "relation": 1}
+    ).to_list(length=None)
+
+    family_ids = to_object_ids({link["family_user_id"] for link in links})
+    users = await db.users.find(
+        {"_id": {"$in": family_ids}}, {"email": 1, "full_name": 1}
+    ).to_list(length=len(family_ids))
+    users_by_id = {str(user["_id"]): user for user in users}
+
+    family = []
+    for link in links:
+        user = users_by_id.get(link["family_user_id"])
+        if user:
+            family.append({
+                "family_user_id": link["family_user_id"],
+                "email": user["email"],
+                "full_name": user.get("full_name"),
+                "relation": link.get("relation"),
+            })
+    return family
+
+
+async def _symptom_checks(db, user_id: str):
+    cursor = (
+        db.symptom_records
+        .find({"patient_id": user_id}, {"patient_id": 0})
+        .sort("timestamp", -1)
+        .limit(RECENT_SYMPTOM_CHECKS)
+    )
+    return [serialize_doc(doc) for doc in await cursor.to_list(length=RECENT_SYMPTOM_CHECKS)]
+
+
+async def _vitals(db, user_id: str):
+    """Most recent daily rollup (today or yesterday) per vital type."""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    cursor = db[ROLLUPS_COLLECTION].find(
+        {"patient_id": user_id, "resolution": "day", "bucket": {"$gte": today - timedelta(days=1)}},
+        {"_id": 0, "type": 1, "bucket": 1, "count": 1, "sum": 1, "min": 1, "max": 1},
+    ).sort("bucket", 1)
+
+    latest = {}
+    async for doc in cursor:
+        latest[doc["type"]] = {
+            "day": doc["bucket"].isoformat(),
+            "count": doc["count"],
+            "min": doc["min"],
+            "max": doc["max"],
+            "mean": doc["sum"] / doc["count"],
+        }
+    return latest
+
+
+async def _wallet(db, user_id: str):
+    wallet = await db[WALLETS_COLLECTION].find_one(
+        {"patient_id": user_id}, {"_id": 0, "total_points": 1, "streak": 1}
+    )
+    return wallet or {"total_points": 0, "streak": 0}
+
+
+SECTIONS = {
+    "profile": _profile,
+    "prescriptions": _prescriptions,
+    "family": _family,
+    "symptom_checks": _symptom_checks,
+    "vitals": _vitals,
+    "wallet": _wallet,
+}
+
+
+async def _run_section(name: str, loader, db, user_id: str, timeout: float):
+    try:
+        return await asyncio.wait_for(loader(db, user_id), timeout), None
+    except asyncio.TimeoutError:
+        logger.warning("Dashboard section %s timed out", name)
+        return None, "timeout"
+    except Exception:
+        logger.exception("Dashboard section %s failed", name)
+        return None, "error"
+
+
+# -----------------------------------------------------------
+# Patient dashboard
+# -----------------------------------------------------------
+@router.get("/")
+async def get_dashboard(
+    current_user: dict = Depends(
+        RoleChecker(["patient"], detail="Only patients have a dashboard")
+    )
+):
+    """
+    Everything the patient home page needs in one call. Sections are
+    fetched concurrently; a section that fails or exceeds its timeout is
+    returned as null and listed in `errors`, the rest are still served.
+    """
+    db = get_routed_db("dashboard")
+    user_id = current_user["user_id"]
+    timeout = settings.DASHBOARD_SECTION_TIMEOUT_SECONDS
+
+    results = await asyncio.gather(*(
+        _run_section(name, loader, db, user_id, timeout)
+        for name, loader in SECTIONS.items()
+    ))
+
+    response = {"user": {
+        "user_id": user_id,
+        "email": current_user["email"],
+        "full_name": current_user["full_name"],
+    }}
+    errors = {}
+    for name, (data, error) in zip(SECTIONS, results):
+        response[name] = data
+        if error:
+            errors[name] = error
+
+    response["errors"] = errors
+    response["partial"] = bool(errors)
+    return response
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 from app.db.mongodb import get_db
-from app.core.deps import get_current_user
+from app.core.rbac import RoleChecker
+from app.core.principal_cache import invalidate_user
 
 router = APIRouter(prefix="/doctors", tags=["Doctors"])
 
+require_doctor = RoleChecker(["doctor"], detail="Access denied")
+
 
 class DoctorProfile(BaseModel):
     specialization: str
@@ -16,19 +19,12 @@ class DoctorProfile(BaseModel):
 @router.post("/profile")
 async def create_doctor_profile(
     profile: DoctorProfile,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(
+        RoleChecker(["doctor"], detail="Only doctors can create profiles")
+    )
 ):
     db = get_db()
 
-    # Only doctors can create doctor profiles
-    if current_user["email"] is None:
-        raise HTTPException(status_code=401, detail="Invalid user")
-
-    # get user document
-    user = await db.users.find_one({"email": current_user["email"]})
-    if user["role"] != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can create profiles")
-
     existing = await db.doctor_profiles.find_one({"user_id": current_user["user_id"]})
     if existing:
         raise HTTPException(status_code=400, detail="Profile already exists")
@@ -44,14 +40,10 @@ async def create_doctor_profile(
 
 @router.get("/me")
 async def get_doctor_profile(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_doctor)
 ):
     db = get_db()
 
-    user = await db.users.find_one({"email": current_user["email"]})
-    if user["role"] != "doctor":
-        raise HTTPException(status_code=403, detail="Access denied")
-
     profile = await db.doctor_profiles.find_one({"user_id": current_user["user_id"]})
     if not profile:
         raise HTTPException(status_code=404, detail="Doctor profile not found")
@@ -64,14 +56,10 @@ async def get_doctor_profile(
 @router.put("/profile")
 async def update_doctor_profile(
     profile: DoctorProfile,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_doctor)
 ):
     db = get_db()
 
-    user = await db.users.find_one({"email": current_user["email"]})
-    if user["role"] != "doctor":
-        raise HTTPException(status_code=403, detail="Access denied")
-
     existing = await db.doctor_profiles.find_one({"user_id": current_user["user_id"]})
     if not existing:
         raise HTTPException(status_code=404, detail="Profile does not exist")
@@ -80,6 +68,7 @@ async def update_doctor_profile(
         {"user_id": current_user["user_id"]}, 
         {"$set": profile.dict()}
     )
+    invalidate_user(current_user["user_id"])
 
     return {"message": "Doctor profile updated successfully"}
 
@@ -87,18 +76,15 @@ async def update_doctor_profile(
 
 @router.delete("/profile")
 async def delete_doctor_profile(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_doctor)
 ):
     db = get_db()
 
-    user = await db.users.find_one({"email": current_user["email"]})
-    if user["role"] != "doctor":
-        raise HTTPException(status_code=403, detail="Access denied")
-
     existing = await db.doctor_profiles.find_one({"user_id": current_user["user_id"]})
     if not existing:
         raise HTTPException(status_code=404, detail="Profile not found")
 
     await db.doctor_profiles.delete_one({"user_id": current_user["user_id"]})
+    invalidate_user(current_user["user_id"])
 
     return {"message": "Doctor profile deleted successfully"}
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, EmailStr
-from app.db.mongodb import get_db
-from app.core.deps import get_current_user
+from app.db.mongodb import get_db, get_routed_db
+from app.core.rbac import RoleChecker
+from app.ai.notification_service import notify_family_link
+from app.ai.leaderboard_service import leaderboards
+from app.utils.helpers import decode_cursor, encode_cursor, to_object_ids
 
 router = APIRouter(prefix="/family", tags=["Family"])
 
@@ -14,7 +17,9 @@ class FamilyLinkCreate(BaseModel):
 @router.post("/link")
 async def create_family_link(
     payload: FamilyLinkCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(
+        RoleChecker(["family"], detail="Only family members can create links")
+    )
 ):
     """
     Link a logged-in family member to a patient by patient email.
@@ -23,11 +28,6 @@ async def create_family_link(
     if db is None:
         raise HTTPException(status_code=500, detail="Database not initialized")
 
-    # Current user must have role = "family"
-    family_user = await db.users.find_one({"email": current_user["email"]})
-    if not family_user or family_user.get("role") != "family":
-        raise HTTPException(status_code=403, detail="Only family members can create links")
-
     # Find the patient user
     patient_user = await db.users.find_one({"email": payload.patient_email})
     if not patient_user or patient_user.get("role") != "patient":
@@ -50,33 +50,68 @@ async def create_family_link(
     }
 
     await db.family_links.insert_one(doc)
+    notify_family_link(patient_id, family_id, payload.relation, linked=True)
+    leaderboards.link_family(family_id, patient_id)
     return {"message": "Family link created successfully"}
 
 
 @router.get("/my-patients")
 async def get_my_linked_patients(
-    current_user: dict = Depends(get_current_user)
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = None,
+    current_user: dict = Depends(
+        RoleChecker(["family"], detail="Only family members can view this")
+    )
 ):
     """
-    List all patients linked to the logged-in family member.
+    List patients linked to the logged-in family member.
+
+    Links are paged by `_id`; pass the returned `next_cursor` as `after`
+    to fetch the next page. Patient users for a page are fetched with a
+    single `$in` query.
     """
-    db = get_db()
+    db = get_routed_db("family")
     if db is None:
         raise HTTPException(status_code=500, detail="Database not initialized")
 
-    family_user = await db.users.find_one({"email": current_user["email"]})
-    if not family_user or family_user.get("role") != "family":
-        raise HTTPException(status_code=403, detail="Only family members can view this")
-
     family_id = current_user["user_id"]
 
-    links_cursor = db.family_links.find({"family_user_id": family_id})
-    links = await links_cursor.to_list(length=100)
+    query = {"family_user_id": family_id}
+    if after:
+        last_id = decode_cursor(after).get("_id")
+        if last_id is None:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query["_id"] = {"$gt": last_id}
+
+    links_cursor = (
+        db.family_links.find(
+            query,
+            {"patient_user_id": 1, "relation": 1},
+        )
+        .sort("_id", 1)
+        .limit(limit + 1)
+    )
+    links = await links_cursor.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(links) > limit:
+        links = links[:limit]
+        next_cursor = encode_cursor({"_id": links[-1]["_id"]})
+
+    # One round trip for every patient on this page
+    patient_ids = to_object_ids({link["patient_user_id"] for link in links})
+    users_cursor = db.users.find(
+        {"_id": {"$in": patient_ids}},
+        {"email": 1, "full_name": 1},
+    )
+    users_by_id = {
+        str(user["_id"]): user
+        for user in await users_cursor.to_list(length=len(patient_ids))
+    }
 
     patients = []
     for link in links:
-        patient_user = await db.users.find_one({"_id": link["patient_user_id"]})
-        # If you stored _id as ObjectId, you’d need to convert; keeping it simple for now
+        patient_user = users_by_id.get(link["patient_user_id"])
         if not patient_user:
             continue
 
@@ -89,13 +124,15 @@ async def get_my_linked_patients(
             }
         )
 
-    return {"linked_patients": patients}
+    return {"linked_patients": patients, "next_cursor": next_cursor}
 
 
 @router.delete("/link/{patient_user_id}")
 async def delete_family_link(
     patient_user_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(
+        RoleChecker(["family"], detail="Only family members can delete links")
+    )
 ):
     """
     Remove a family ↔ patient link.
@@ -104,17 +141,16 @@ async def delete_family_link(
     if db is None:
         raise HTTPException(status_code=500, detail="Database not initialized")
 
-    family_user = await db.users.find_one({"email": current_user["email"]})
-    if not family_user or family_user.get("role") != "family":
-        raise HTTPException(status_code=403, detail="Only family members can delete links")
-
     family_id = current_user["user_id"]
 
-    result = await db.family_links.delete_one(
+    link = await db.family_links.find_one_and_delete(
         {"family_user_id": family_id, "patient_user_id": patient_user_id}
     )
 
-    if result.deleted_count == 0:
+    if link is None:
         raise HTTPException(status_code=404, detail="Link not found")
 
+    notify_family_link(patient_user_id, family_id, link.get("relation", ""), linked=False)
+    leaderboards.unlink_family(family_id, patient_user_id)
+
     return {"message": "Family link deleted successfully"}
@@ -0,0 +1,228 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+
+from app.ai.gamification_service import (
+    LEDGER_COLLECTION,
+    TASK_POINTS,
+    WALLETS_COLLECTION,
+    points_ledger,
+    task_award,
+)
+from app.ai.leaderboard_service import leaderboards
+from app.core.deps import get_current_user
+from app.core.rbac import RoleChecker
+from app.db.mongodb import get_db, get_routed_db
+from app.utils.helpers import decode_cursor, encode_cursor, serialize_doc, to_object_ids
+
+router = APIRouter(prefix="/gamification", tags=["Gamification"])
+
+require_patient = RoleChecker(["patient"], detail="Only patients can complete tasks")
+
+
+class TaskCompletion(BaseModel):
+    task_name: str
+
+
+async def _check_access(current_user: dict, patient_id: str):
+    """
+    Patients see their own points, family members their linked patients'.
+    Links are read from the primary so a revoked one stops working at once.
+    """
+    if current_user["user_id"] == patient_id:
+        return
+    link = await get_db().family_links.find_one({
+        "family_user_id": current_user["user_id"],
+        "patient_user_id": patient_id
+    })
+    if not link:
+        raise HTTPException(status_code=403, detail="Not authorized to view this patient's points")
+
+
+# -----------------------------------------------------------
+# Task catalog
+# -----------------------------------------------------------
+@router.get("/tasks")
+async def list_tasks():
+    return {"tasks": [{"task_name": name, "points": points} for name, points in TASK_POINTS.items()]}
+
+
+# -----------------------------------------------------------
+# Patient completes a task
+# -----------------------------------------------------------
+@router.post("/tasks")
+async def complete_task(
+    payload: TaskCompletion,
+    current_user: dict = Depends(require_patient)
+):
+    if payload.task_name not in TASK_POINTS:
+        raise HTTPException(status_code=404, detail="Unknown task")
+
+    db = get_db()
+    award = task_award(current_user["user_id"], payload.task_name)
+    wallet = await points_ledger.award(db, award)
+    if wallet is None:
+        raise HTTPException(status_code=409, detail="Task already completed today")
+
+    return {
+        "message": "Task completed",
+        "points_earned": award.points,
+        "total_points": wallet["total_points"],
+    }
+
+
+# -----------------------------------------------------------
+# Wallet balance (patient or linked family)
+# -----------------------------------------------------------
+@router.get("/wallet/{patient_id}")
+async def get_wallet(
+    patient_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_routed_db("gamification")
+    await _check_access(current_user, patient_id)
+
+    wallet = await db[WALLETS_COLLECTION].find_one(
+        {"patient_id": patient_id}, {"_id": 0, "recent_award_keys": 0}
+    )
+    if not wallet:
+        return {"patient_id": patient_id, "total_points": 0, "streak": 0}
+    return serialize_doc(wallet)
+
+
+# -----------------------------------------------------------
+# Ledger history, newest first
+# -----------------------------------------------------------
+@router.get("/history/{patient_id}")
+async def get_history(
+    patient_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    after: str | None = None,
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_routed_db("gamification")
+    await _check_access(current_user, patient_id)
+
+    query = {"patient_id": patient_id}
+    if after:
+        position = decode_cursor(after)
+        if "timestamp" not in position or "_id" not in position:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query["$or"] = [
+            {"timestamp": {"$lt": position["timestamp"]}},
+            {"timestamp": position["timestamp"], "_id": {"$lt": position["_id"]}},
+        ]
+
+    cursor = (
+        db[LEDGER_COLLECTION]
+        .find(query, {"wallet_applied": 0, "wallet_fields": 0})
+        .sort([("timestamp", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    data = await cursor.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(data) > limit:
+        data = data[:limit]
+        next_cursor = encode_cursor({"timestamp": data[-1]["timestamp"], "_id": data[-1]["_id"]})
+
+    return {
+        "history": [serialize_doc(doc) for doc in data],
+        "next_cursor": next_cursor,
+    }
+
+
+# -----------------------------------------------------------
+# Leaderboards
+# -----------------------------------------------------------
+@router.get("/leaderboard/{scope}")
+async def get_leaderboard(
+    scope: Literal["global", "clinic", "family"],
+    group_id: str | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Top entries of a leaderboard plus the caller's own rank (`me`).
+
+    `group_id` defaults to the caller's clinic (scope `clinic`: a patient's
+    profile clinic, or a doctor's first `clinic_staff` clinic) or family
+    group (scope `family`: the family member's own id, or for a patient
+    the first family member they are linked to).
+
+    Names and patient ids are only returned on family boards and to the
+    clinic's own staff doctors; everyone else gets rank and points only.
+    """
+    user_id = current_user["user_id"]
+    role = current_user["role"]
+
+    staff_clinics = []
+    if scope == "clinic" and role == "doctor":
+        staff_clinics = await leaderboards.staff_clinics(get_db(), user_id)
+
+    if scope == "global":
+        group_id = ""
+    elif scope == "clinic":
+        group_id = group_id or (
+            staff_clinics[0] if staff_clinics else leaderboards.clinic_of(user_id)
+        )
+    elif not group_id:
+        if role == "family":
+            group_id = user_id
+        else:
+            groups = leaderboards.family_groups(user_id)
+            group_id = groups[0] if groups else None
+
+    if group_id is None:
+        raise HTTPException(status_code=404, detail=f"No {scope} leaderboard for this user")
+
+    board = leaderboards.board(scope, group_id)
+
+    # Group boards are visible to their members, the family member owning
+    # the group and the clinic's staff doctors
+    clinic_doctor = group_id in staff_clinics
+    if scope != "global":
+        allowed = (
+            (board is not None and user_id in board)
+            or (scope == "family" and user_id == group_id)
+            or clinic_doctor
+        )
+        if not allowed:
+            raise HTTPException(status_code=403, detail="Not authorized to view this leaderboard")
+
+    if board is None:
+        return {"scope": scope, "group_id": group_id, "size": 0, "entries": [], "me": None}
+
+    entries = board.top(limit, offset)
+    identified = scope == "family" or clinic_doctor
+
+    if identified:
+        # One round trip for the names on this page
+        patient_ids = to_object_ids({e["patient_id"] for e in entries})
+        users_cursor = get_routed_db("gamification").users.find({"_id": {"$in": patient_ids}}, {"full_name": 1})
+        names = {
+            str(user["_id"]): user.get("full_name")
+            for user in await users_cursor.to_list(length=len(patient_ids))
+        }
+        for entry in entries:
+            entry["full_name"] = names.get(entry["patient_id"])
+    else:
+        entries = [
+            {"rank": e["rank"], "points": e["points"], "is_me": e["patient_id"] == user_id}
+            for e in entries
+        ]
+
+    me = None
+    position = board.rank(user_id)
+    if position:
+        me = {"rank": position[0], "points": position[1]}
+
+    return {
+        "scope": scope,
+        "group_id": group_id,
+        "size": len(board),
+        "entries": entries,
+        "me": me,
+    }
@@ -0,0 +1,40 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.core.metrics import render_prometheus
+
+router = APIRouter(tags=["Metrics"])
+
+
+def require_metrics_token(request: Request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    expected = settings.METRICS_TOKEN or ""
+    if (
+        not expected
+        or scheme.lower() != "bearer"
+        or not hmac.compare_digest(token.encode(), expected.encode())
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# -----------------------------------------------------------
+# Prometheus scrape endpoint
+# -----------------------------------------------------------
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """
+    Route latency histograms, Mongo commands per request, per-command
+    latency and the counters of the in-process components. Only mounted
+    when METRICS_ENABLED and METRICS_TOKEN are both set; scrapers send
+    the token as `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
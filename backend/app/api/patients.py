@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.core.deps import get_current_user
+from app.core.principal_cache import invalidate_user
+from app.ai.leaderboard_service import leaderboards
 from app.db.mongodb import get_db
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
@@ -12,6 +14,7 @@ class PatientProfile(BaseModel):
     blood_group: str
     allergies: str
     medical_history: str
+    clinic_id: str | None = None
 
 
 @router.post("/profile")
@@ -35,6 +38,7 @@ async def create_patient_profile(
     doc["user_id"] = user_id
 
     await db.patient_profiles.insert_one(doc)
+    leaderboards.set_clinic(user_id, profile.clinic_id)
     return {"message": "Profile created successfully", "profile": doc}
 
 
@@ -72,6 +76,8 @@ async def update_patient_profile(
         {"user_id": user_id},
         update_doc
     )
+    invalidate_user(user_id)
+    leaderboards.set_clinic(user_id, profile.clinic_id)
 
     return {"message": "Profile updated successfully"}
 
@@ -90,5 +96,7 @@ async def delete_patient_profile(
         raise HTTPException(status_code=404, detail="Profile not found")
 
     await db.patient_profiles.delete_one({"user_id": user_id})
+    invalidate_user(user_id)
+    leaderboards.set_clinic(user_id, None)
 
     return {"message": "Profile deleted successfully"}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query, Response
+
+from app.ai.pharmacy_catalog import get_catalog
+from app.core.deps import get_current_user
+
+router = APIRouter(prefix="/pharmacy", tags=["Pharmacy"])
+
+
+# -----------------------------------------------------------
+# Medicine autocomplete
+# -----------------------------------------------------------
+@router.get("/search")
+async def search_medicines(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Medicines whose product or generic name starts with `q`, then those
+    with a later word starting with `q` (case-insensitive).
+    """
+    catalog = get_catalog()
+    response.headers["Cache-Control"] = "private, max-age=300"
+    return {
+        "query": q,
+        "catalog_version": catalog.version,
+        "results": [m.to_dict() for m in catalog.search(q, limit)],
+    }
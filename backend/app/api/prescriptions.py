@@ -1,23 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from datetime import datetime
-from app.db.mongodb import get_db
+import json
+from datetime import date, datetime, time
+
+import pytz
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator, model_validator
+from pymongo import ReturnDocument
+
+from app.ai.pharmacy_catalog import get_catalog
+from app.ai.reminder_service import reminder_engine
+from app.config import settings
+from app.db.mongodb import get_db, get_routed_db
 from app.core.deps import get_current_user
+from app.core.rbac import RoleChecker
+from app.utils.helpers import decode_cursor, encode_cursor, serialize_doc
 
 router = APIRouter(prefix="/prescriptions", tags=["Prescriptions"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+PRESCRIPTION_FIELDS = {
+    "doctor_user_id",
+    "patient_user_id",
+    "diagnosis",
+    "medicines",
+    "notes",
+    "schedule",
+    "date",
+}
+
+
+class DoseSchedule(BaseModel):
+    times: list[str] = Field(min_length=1)   # local "HH:MM"
+    timezone: str = "UTC"
+    start_date: date | None = None
+    end_date: date | None = None
+
+    @field_validator("times")
+    @classmethod
+    def valid_times(cls, value: list[str]) -> list[str]:
+        try:
+            return sorted({time.fromisoformat(t).strftime("%H:%M") for t in value})
+        except ValueError:
+            raise ValueError("Dose times must be HH:MM")
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value: str) -> str:
+        if value not in pytz.all_timezones_set:
+            raise ValueError("Unknown timezone")
+        return value
+
+    @model_validator(mode="after")
+    def ordered_dates(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        return self
+
 
 class PrescriptionCreate(BaseModel):
     patient_user_id: str
     diagnosis: str
     medicines: list[str]
     notes: str | None = None
+    schedule: DoseSchedule | None = None
 
 
 class PrescriptionUpdate(BaseModel):
     diagnosis: str | None = None
     medicines: list[str] | None = None
     notes: str | None = None
+    # Omitted: unchanged; null or {}: remove the schedule and its reminders
+    schedule: DoseSchedule | None = None
+
+    @field_validator("schedule", mode="before")
+    @classmethod
+    def empty_schedule(cls, value):
+        return None if value == {} else value
+
+    @property
+    def clears_schedule(self) -> bool:
+        return "schedule" in self.model_fields_set and self.schedule is None
+
+
+def _resolve_medicines(names: list[str]) -> tuple[list[str], list[dict]]:
+    """
+    Map product names onto their catalog spelling; generic names (salts)
+    are kept as written. Returns the names and the unrecognised ones with
+    suggestions, or raises 422 for those when validation is strict.
+    """
+    catalog = get_catalog()
+    resolved = []
+    unknown = []
+    for name in names:
+        medicine = catalog.lookup(name)
+        if medicine is not None:
+            resolved.append(medicine.name)
+            continue
+
+        resolved.append(name)
+        if catalog.lookup_generic(name) is None:
+            unknown.append({
+                "name": name,
+                "suggestions": [m.name for m in catalog.search(name, 5)],
+            })
+
+    if unknown and settings.PRESCRIPTION_VALIDATE_MEDICINES:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Unknown medicines", "unknown": unknown},
+        )
+    return resolved, unknown
+
+
+def _with_warnings(response: dict, unknown: list[dict]) -> dict:
+    if unknown:
+        response["warnings"] = {"unknown_medicines": unknown}
+    return response
+
+
+def _prescription_filter(prescription_id: str) -> dict:
+    if not ObjectId.is_valid(prescription_id):
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    return {"_id": ObjectId(prescription_id)}
 
 
 # -----------------------------------------------------------
@@ -26,17 +133,17 @@ class PrescriptionUpdate(BaseModel):
 @router.post("/")
 async def create_prescription(
     payload: PrescriptionCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(
+        RoleChecker(["doctor"], detail="Only doctors can create prescriptions")
+    )
 ):
     db = get_db()
-
-    # Only doctors can write prescriptions
-    doctor = await db.users.find_one({"email": current_user["email"]})
-    if doctor.get("role") != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can create prescriptions")
+    medicines, unknown = _resolve_medicines(payload.medicines)
 
     # Check that patient exists
-    patient = await db.users.find_one({"_id": payload.patient_user_id})
+    patient = None
+    if ObjectId.is_valid(payload.patient_user_id):
+        patient = await db.users.find_one({"_id": ObjectId(payload.patient_user_id)})
     if not patient or patient.get("role") != "patient":
         raise HTTPException(status_code=404, detail="Patient not found")
 
@@ -44,13 +151,15 @@ async def create_prescription(
         "doctor_user_id": current_user["user_id"],
         "patient_user_id": payload.patient_user_id,
         "diagnosis": payload.diagnosis,
-        "medicines": payload.medicines,
+        "medicines": medicines,
         "notes": payload.notes,
+        "schedule": payload.schedule.model_dump(mode="json") if payload.schedule else None,
         "date": datetime.utcnow(),
     }
 
     await db.prescriptions.insert_one(doc)
-    return {"message": "Prescription created successfully"}
+    reminder_engine.schedule(doc)
+    return _with_warnings({"message": "Prescription created successfully"}, unknown)
 
 
 # -----------------------------------------------------------
@@ -59,17 +168,30 @@ async def create_prescription(
 @router.get("/patient/{patient_user_id}")
 async def get_prescriptions_for_patient(
     patient_user_id: str,
+    limit: int | None = Query(None, ge=1),
+    after: str | None = None,
+    fields: str | None = None,
+    stream: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    db = get_db()
+    """
+    Prescriptions newest first, keyset-paged by (`date`, `_id`).
+
+    - `limit` / `after`: page size and the `next_cursor` of the previous page
+    - `fields`: comma-separated projection, e.g. `diagnosis,medicines`
+    - `stream=true`: NDJSON, one prescription per line, read straight off
+      the cursor (no page-size cap, `limit` still applies if given)
+    """
+    db = get_routed_db("prescriptions")
 
     # Patient trying to access MUST match patient_user_id
     if current_user["user_id"] == patient_user_id:
         pass  # allowed
 
     else:
-        # Check if family is linked
-        link = await db.family_links.find_one({
+        # Check if family is linked; on the primary, so a revoked link
+        # stops working even while secondaries lag
+        link = await get_db().family_links.find_one({
             "family_user_id": current_user["user_id"],
             "patient_user_id": patient_user_id
         })
@@ -77,10 +199,51 @@ async def get_prescriptions_for_patient(
         if not link:
             raise HTTPException(status_code=403, detail="Not authorized to view this patient's prescriptions")
 
-    cursor = db.prescriptions.find({"patient_user_id": patient_user_id})
-    data = await cursor.to_list(length=200)
+    query = {"patient_user_id": patient_user_id}
+    if after:
+        position = decode_cursor(after)
+        if "date" not in position or "_id" not in position:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query["$or"] = [
+            {"date": {"$lt": position["date"]}},
+            {"date": position["date"], "_id": {"$lt": position["_id"]}},
+        ]
 
-    return {"prescriptions": data}
+    projection = None
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - PRESCRIPTION_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        # `date` and `_id` are always returned; the cursor is built from them
+        projection = {f: 1 for f in requested | {"date"}}
+
+    cursor = db.prescriptions.find(query, projection).sort([("date", -1), ("_id", -1)])
+
+    # ---- NDJSON streaming ----
+    if stream:
+        if limit:
+            cursor = cursor.limit(limit)
+
+        async def ndjson():
+            async for doc in cursor:
+                yield json.dumps(serialize_doc(doc)) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    # ---- Paged JSON ----
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    data = await cursor.limit(page_size + 1).to_list(length=page_size + 1)
+
+    next_cursor = None
+    if len(data) > page_size:
+        data = data[:page_size]
+        next_cursor = encode_cursor({"date": data[-1]["date"], "_id": data[-1]["_id"]})
+
+    return {
+        "prescriptions": [serialize_doc(doc) for doc in data],
+        "next_cursor": next_cursor,
+    }
 
 
 # -----------------------------------------------------------
@@ -93,8 +256,9 @@ async def update_prescription(
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
+    query = _prescription_filter(prescription_id)
 
-    prescription = await db.prescriptions.find_one({"_id": prescription_id})
+    prescription = await db.prescriptions.find_one(query)
     if not prescription:
         raise HTTPException(status_code=404, detail="Prescription not found")
 
@@ -102,14 +266,24 @@ async def update_prescription(
     if prescription["doctor_user_id"] != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Cannot modify another doctor's prescription")
 
-    update_data = {k: v for k, v in payload.dict().items() if v is not None}
+    update_data = {k: v for k, v in payload.model_dump(mode="json").items() if v is not None}
+    if payload.clears_schedule:
+        update_data["schedule"] = None
+    unknown = []
+    if "medicines" in update_data:
+        update_data["medicines"], unknown = _resolve_medicines(update_data["medicines"])
+    if not update_data:
+        return {"message": "Prescription updated"}
 
-    await db.prescriptions.update_one(
-        {"_id": prescription_id},
-        {"$set": update_data}
+    updated = await db.prescriptions.find_one_and_update(
+        query,
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
+    if updated:
+        reminder_engine.schedule(updated)
 
-    return {"message": "Prescription updated"}
+    return _with_warnings({"message": "Prescription updated"}, unknown)
 
 
 # -----------------------------------------------------------
@@ -121,13 +295,15 @@ async def delete_prescription(
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
+    query = _prescription_filter(prescription_id)
 
-    prescription = await db.prescriptions.find_one({"_id": prescription_id})
+    prescription = await db.prescriptions.find_one(query)
     if not prescription:
         raise HTTPException(status_code=404, detail="Prescription not found")
 
     if prescription["doctor_user_id"] != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Cannot delete another doctor's prescription")
 
-    await db.prescriptions.delete_one({"_id": prescription_id})
+    await db.prescriptions.delete_one(query)
+    reminder_engine.cancel(prescription_id)
     return {"message": "Prescription deleted"}
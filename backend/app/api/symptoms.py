@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List
+from datetime import datetime
 
-from app.ai.symptoms import analyze_symptoms
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, ValidationError
+from typing import Any, List
+
+from app.ai.symptoms import result_cache
+from app.config import settings
+from app.core.rbac import RoleChecker
+from app.db.mongodb import get_db
 
 router = APIRouter(
     prefix="/symptomchecker",
@@ -32,13 +37,137 @@ class SymptomCheckResponse(BaseModel):
     advice: str
 
 
+# -----------------------------
+# Batch Schemas
+# -----------------------------
+class SymptomBatchRequest(BaseModel):
+    # Items are validated one by one so a bad item fails alone
+    requests: List[Any]
+
+
+class SymptomBatchItem(BaseModel):
+    index: int
+    result: SymptomCheckResponse | None = None
+    error: str | None = None
+
+
+class SymptomBatchResponse(BaseModel):
+    results: List[SymptomBatchItem]
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison over a comma-separated tag list."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _cache_headers(etag: str) -> dict:
+    # Health assessments must not be stored by shared caches
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.SYMPTOM_CACHE_MAX_AGE_SECONDS}",
+    }
+
+
 # -----------------------------
 # API Endpoint
 # -----------------------------
 @router.post("/", response_model=SymptomCheckResponse)
-def check_symptoms(payload: SymptomCheckRequest):
+def check_symptoms(payload: SymptomCheckRequest, response: Response):
     if not payload.symptoms:
         raise HTTPException(status_code=400, detail="No symptoms provided")
 
-    result = analyze_symptoms(payload.symptoms)
+    result, etag = result_cache.analyze(payload.symptoms)
+    response.headers["ETag"] = etag
+    return result
+
+
+@router.get("/", response_model=SymptomCheckResponse)
+def check_symptoms_cacheable(
+    request: Request,
+    response: Response,
+    symptoms: List[str] = Query(..., min_length=1),
+):
+    """
+    Same as `POST /symptomchecker/` for `?symptoms=a&symptoms=b`, but
+    cacheable by the client: revalidate with `If-None-Match` for a 304.
+    """
+    result, etag = result_cache.analyze(symptoms)
+
+    headers = _cache_headers(etag)
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return result
+
+
+@router.post("/batch", response_model=SymptomBatchResponse)
+def check_symptoms_batch(payload: SymptomBatchRequest):
+    """
+    Score many symptom checks in one call. Results come back in request
+    order; invalid items carry an `error` instead of a `result`.
+    """
+    if len(payload.requests) > settings.SYMPTOM_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.SYMPTOM_BATCH_MAX_ITEMS} items",
+        )
+
+    results: List[SymptomBatchItem] = []
+    valid: List[tuple] = []
+
+    for index, item in enumerate(payload.requests):
+        try:
+            request_item = SymptomCheckRequest.model_validate(item)
+        except ValidationError as exc:
+            error = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}"
+                for err in exc.errors()
+            )
+            results.append(SymptomBatchItem(index=index, error=error))
+            continue
+
+        if not request_item.symptoms:
+            results.append(SymptomBatchItem(index=index, error="No symptoms provided"))
+            continue
+
+        item_result = SymptomBatchItem(index=index)
+        results.append(item_result)
+        valid.append((item_result, request_item.symptoms))
+
+    # ---- Score every valid item together ----
+    scored = result_cache.analyze_batch([symptoms for _, symptoms in valid])
+    for (item_result, _), (result, _etag) in zip(valid, scored):
+        item_result.result = SymptomCheckResponse.model_validate(result)
+
+    return {"results": results}
+
+
+# -----------------------------
+# Recorded check (patients)
+# -----------------------------
+@router.post("/record", response_model=SymptomCheckResponse)
+async def check_and_record_symptoms(
+    payload: SymptomCheckRequest,
+    current_user: dict = Depends(
+        RoleChecker(["patient"], detail="Only patients can record symptom checks")
+    )
+):
+    """Same as `POST /symptomchecker/`, and saved to the patient's history."""
+    if not payload.symptoms:
+        raise HTTPException(status_code=400, detail="No symptoms provided")
+
+    result, _etag = result_cache.analyze(payload.symptoms)
+
+    await get_db().symptom_records.insert_one({
+        "patient_id": current_user["user_id"],
+        "symptoms": payload.symptoms,
+        "note": payload.description,
+        "result": result,
+        "timestamp": datetime.utcnow(),
+    })
     return result
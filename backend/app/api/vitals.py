@@ -0,0 +1,257 @@
+import json
+from datetime import datetime, timedelta
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from app.ai.health_ai import anomaly_detector
+from app.ai.vitals_service import (
+    VITAL_RANGES,
+    VITAL_TYPES,
+    VitalsBufferFull,
+    choose_resolution,
+    make_vitals_doc,
+    query_vitals_range,
+    to_utc_naive,
+    vitals_buffer,
+)
+from app.config import settings
+from app.core.deps import get_current_user
+from app.core.rbac import RoleChecker
+from app.db.mongodb import get_db, get_routed_db
+
+router = APIRouter(prefix="/vitals", tags=["Vitals"])
+
+require_patient = RoleChecker(["patient"], detail="Only patients can record vitals")
+
+UPLOAD_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 20
+
+
+class VitalReading(BaseModel):
+    type: str
+    # NaN/Infinity would poison rollup sums and anomaly baselines
+    value: float = Field(allow_inf_nan=False)
+    timestamp: datetime | None = None
+
+    @field_validator("type")
+    @classmethod
+    def known_type(cls, value: str) -> str:
+        value = value.lower().strip()
+        if value not in VITAL_TYPES:
+            raise ValueError(f"Unknown vital type, expected one of {sorted(VITAL_TYPES)}")
+        return value
+
+    @model_validator(mode="after")
+    def plausible_value(self):
+        low, high = VITAL_RANGES[self.type]
+        if not low <= self.value <= high:
+            raise ValueError(f"{self.type} must be between {low} and {high}")
+        return self
+
+
+class VitalsBatch(BaseModel):
+    readings: List[VitalReading] = Field(min_length=1)
+
+
+def _enqueue(docs: List[dict]) -> List[dict]:
+    """Buffer readings for writing and return the anomalies they raise."""
+    try:
+        vitals_buffer.add(docs)
+    except VitalsBufferFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Vitals ingestion is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    return [a.to_dict() for a in anomaly_detector.observe_docs(docs)]
+
+
+# -----------------------------------------------------------
+# Single reading
+# -----------------------------------------------------------
+@router.post("/", status_code=202)
+async def record_vital(
+    reading: VitalReading,
+    current_user: dict = Depends(require_patient)
+):
+    anomalies = _enqueue([
+        make_vitals_doc(current_user["user_id"], reading.type, reading.value, reading.timestamp)
+    ])
+    return {"message": "Reading accepted", "accepted": 1, "anomalies": anomalies}
+
+
+# -----------------------------------------------------------
+# Batched readings
+# -----------------------------------------------------------
+@router.post("/batch", status_code=202)
+async def record_vitals_batch(
+    payload: VitalsBatch,
+    current_user: dict = Depends(require_patient)
+):
+    if len(payload.readings) > settings.VITALS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.VITALS_BATCH_MAX_ITEMS} readings",
+        )
+
+    patient_id = current_user["user_id"]
+    anomalies = _enqueue([
+        make_vitals_doc(patient_id, r.type, r.value, r.timestamp)
+        for r in payload.readings
+    ])
+    return {
+        "message": "Readings accepted",
+        "accepted": len(payload.readings),
+        "anomalies": anomalies,
+    }
+
+
+# -----------------------------------------------------------
+# NDJSON upload from home devices
+# -----------------------------------------------------------
+@router.post("/upload", status_code=202)
+async def upload_vitals_ndjson(
+    request: Request,
+    current_user: dict = Depends(require_patient)
+):
+    """
+    One JSON reading per line. The body is parsed as it arrives and
+    queued in chunks; invalid lines are skipped and reported. If the
+    buffer fills mid-upload, the response is 429 and `accepted_lines`
+    says how many lines were taken, so the device can resume after them.
+    """
+    patient_id = current_user["user_id"]
+
+    accepted = 0
+    rejected = 0
+    line_no = 0
+    committed_lines = 0
+    errors = []
+    anomalies: List[dict] = []
+    chunk: List[dict] = []
+    remainder = b""
+
+    async def flush_chunk():
+        nonlocal accepted, chunk, committed_lines
+        if not chunk:
+            committed_lines = line_no
+            return
+        try:
+            vitals_buffer.add(chunk)
+        except VitalsBufferFull:
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "message": "Vitals ingestion is busy, please retry shortly",
+                    "accepted_lines": committed_lines,
+                    "accepted": accepted,
+                },
+                headers={"Retry-After": "1"},
+            )
+        accepted += len(chunk)
+        anomalies.extend(a.to_dict() for a in anomaly_detector.observe_docs(chunk))
+        chunk = []
+        committed_lines = line_no
+
+    def parse_line(raw: bytes):
+        nonlocal line_no, rejected
+        line_no += 1
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            reading = VitalReading.model_validate(json.loads(raw))
+        except ValidationError as exc:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "error": exc.errors()[0]["msg"]})
+            return
+        except ValueError:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "error": "Invalid JSON"})
+            return
+        chunk.append(
+            make_vitals_doc(patient_id, reading.type, reading.value, reading.timestamp)
+        )
+
+    async for data in request.stream():
+        lines = (remainder + data).split(b"\n")
+        remainder = lines.pop()
+        for raw in lines:
+            parse_line(raw)
+            if len(chunk) >= UPLOAD_CHUNK_SIZE:
+                await flush_chunk()
+
+    if remainder:
+        parse_line(remainder)
+    await flush_chunk()
+
+    return {
+        "message": "Upload processed",
+        "lines": line_no,
+        "accepted": accepted,
+        "rejected": rejected,
+        "errors": errors,
+        "anomalies": anomalies,
+    }
+
+
+# -----------------------------------------------------------
+# Range query (patient or linked family)
+# -----------------------------------------------------------
+@router.get("/{patient_id}/{vital_type}")
+async def get_vitals_range(
+    patient_id: str,
+    vital_type: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    resolution: Literal["auto", "raw", "minute", "hour", "day"] = "auto",
+    max_points: int = Query(500, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Readings for one vital over [start, end), default the last 24 hours.
+
+    `resolution=auto` picks the finest rollup (minute/hour/day) whose
+    bucket count over the window fits in `max_points`, e.g. 90 days of
+    heart rate comes back as 90 daily min/max/mean points.
+    """
+    db = get_routed_db("vitals")
+
+    vital_type = vital_type.lower()
+    if vital_type not in VITAL_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown vital type")
+
+    if current_user["user_id"] != patient_id:
+        # Authorization reads the primary; only the data may be stale
+        link = await get_db().family_links.find_one({
+            "family_user_id": current_user["user_id"],
+            "patient_user_id": patient_id
+        })
+        if not link:
+            raise HTTPException(status_code=403, detail="Not authorized to view this patient's vitals")
+
+    end = to_utc_naive(end)
+    start = to_utc_naive(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    if resolution == "auto":
+        resolution = choose_resolution(start, end, max_points)
+
+    points, truncated = await query_vitals_range(
+        db, patient_id, vital_type, start, end, resolution, max_points
+    )
+
+    return {
+        "patient_id": patient_id,
+        "type": vital_type,
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "points": points,
+        "truncated": truncated,
+    }
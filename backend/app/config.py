@@ -1,3 +1,4 @@
+from typing import Dict, Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -5,6 +6,120 @@ class Settings(BaseSettings):
     DATABASE_NAME: str
     SECRET_KEY: str
 
+    # Motor connection pool
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int | None = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int | None = None
+    # Wire compression, e.g. "zstd,snappy" (needs the matching python package)
+    MONGO_COMPRESSORS: str = ""
+    # Per-router read preference, e.g. {"prescriptions": "secondaryPreferred"}
+    MONGO_READ_PREFERENCES: Dict[
+        str,
+        Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"],
+    ] = {}
+
+    # Verified-principal cache used by get_current_user
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
+    # bcrypt worker pool used by /auth/register and /auth/login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # Symptom knowledge base (JSON file or binary directory); empty = bundled
+    SYMPTOM_KB_PATH: str = ""
+    # How often to check the knowledge base for changes; 0 disables hot reload
+    SYMPTOM_KB_RELOAD_SECONDS: float = 30.0
+    # Symptom checker result cache and client-side max-age
+    SYMPTOM_CACHE_SIZE: int = 10_000
+    SYMPTOM_CACHE_MAX_AGE_SECONDS: int = 300
+    SYMPTOM_BATCH_MAX_ITEMS: int = 1000
+
+    # Vitals ingestion buffer
+    VITALS_BUFFER_MAX_SIZE: int = 50_000
+    VITALS_FLUSH_SIZE: int = 1_000
+    VITALS_FLUSH_INTERVAL_SECONDS: float = 1.0
+    VITALS_BATCH_MAX_ITEMS: int = 5_000
+
+    # Vitals anomaly detection
+    ANOMALY_Z_THRESHOLD: float = 3.5
+    ANOMALY_MIN_SAMPLES: int = 30
+    ANOMALY_EWMA_ALPHA: float = 0.1
+    ANOMALY_SNAPSHOT_SECONDS: float = 60.0
+
+    # Notification dispatch; transport is "stdout" or "file"
+    NOTIFICATION_TRANSPORT: str = "stdout"
+    NOTIFICATION_FILE_PATH: str = "notifications.ndjson"
+    NOTIFICATION_WORKERS: int = 2
+    NOTIFICATION_QUEUE_SIZE: int = 10_000
+    NOTIFICATION_BATCH_SIZE: int = 100
+    NOTIFICATION_BATCH_WINDOW_SECONDS: float = 0.5
+    NOTIFICATION_COALESCE_SECONDS: float = 300.0
+    NOTIFICATION_MAX_RETRIES: int = 5
+
+    # Gamification: nightly streak bonus per consecutive day, capped at N days
+    GAMIFICATION_STREAK_BONUS: int = 5
+    GAMIFICATION_STREAK_BONUS_CAP: int = 7
+    # How often ledger entries whose wallet write failed are re-applied
+    GAMIFICATION_REPAIR_SECONDS: float = 300.0
+
+    # Leaderboards: how often changed boards are snapshotted and how many entries
+    LEADERBOARD_SNAPSHOT_SECONDS: float = 300.0
+    LEADERBOARD_SNAPSHOT_SIZE: int = 100
+
+    # Medicine catalog (CSV or NDJSON); empty = bundled
+    PHARMACY_CATALOG_PATH: str = ""
+    # How often to check the catalog file for changes; 0 disables hot reload
+    PHARMACY_CATALOG_RELOAD_SECONDS: float = 60.0
+    # Reject prescriptions naming medicines that are not in the catalog
+    # (by product or generic name); otherwise they are kept and returned
+    # as warnings with suggestions
+    PRESCRIPTION_VALIDATE_MEDICINES: bool = False
+
+    # Chatbot: backend is "stub" (deterministic) or "local" (llama-cpp-python GGUF model)
+    CHATBOT_BACKEND: str = "stub"
+    CHATBOT_MODEL_PATH: str = ""
+    CHATBOT_CONTEXT_TOKENS: int = 2048
+    CHATBOT_THREADS: int = 4
+    CHATBOT_STUB_TOKEN_DELAY_SECONDS: float = 0.0
+    CHATBOT_MAX_TOKENS: int = 256
+    CHATBOT_MAX_CONCURRENCY: int = 1
+    CHATBOT_MAX_QUEUE: int = 16
+    CHATBOT_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    CHATBOT_CACHE_SIZE: int = 1_000
+    CHATBOT_CACHE_TTL_SECONDS: float = 3600.0
+
+    # AI proxy: upstream name -> base URL ("stub://" = in-process fake)
+    AI_UPSTREAMS: Dict[str, str] = {"stub": "stub://"}
+    AI_PROXY_INFER_PATH: str = "/v1/infer"
+    AI_PROXY_POOL_SIZE: int = 100
+    AI_PROXY_POOL_PER_HOST: int = 32
+    AI_PROXY_KEEPALIVE_SECONDS: float = 30.0
+    AI_PROXY_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    AI_PROXY_TIMEOUT_SECONDS: float = 20.0
+    AI_PROXY_UPSTREAM_CONCURRENCY: int = 16
+    AI_PROXY_MAX_ATTEMPTS: int = 3
+    # Start a second attempt if the first has not answered by then; 0 disables
+    AI_PROXY_HEDGE_DELAY_SECONDS: float = 1.0
+    AI_PROXY_BREAKER_FAILURES: int = 5
+    AI_PROXY_BREAKER_RESET_SECONDS: float = 30.0
+    AI_PROXY_STUB_LATENCY_SECONDS: float = 0.05
+    AI_PROXY_STUB_FAILURE_RATE: float = 0.0
+
+    # Dashboard: each section is dropped from the response if it takes longer
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 2.0
+
+    # Metrics: /metrics (Prometheus text format) and Mongo command logging
+    METRICS_ENABLED: bool = False
+    # Bearer token Prometheus must send to /metrics; the route is not
+    # mounted without one
+    METRICS_TOKEN: str | None = None
+    # Log Mongo commands slower than this, with their filter shape
+    SLOW_QUERY_MS: float = 100.0
+    # Log requests that issue more Mongo commands than this (N+1 lookups)
+    REQUEST_DB_COMMANDS_WARN: int = 25
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore"
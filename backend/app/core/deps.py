@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from app.db.mongodb import get_db
 from app.config import settings
+from app.core.principal_cache import principal_cache
 from bson import ObjectId
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -19,6 +20,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    # Serve from the principal cache when this token was verified recently
+    cached = principal_cache.get(user_id, token)
+    if cached is not None:
+        return cached
+
     # Fetch from DB
     db = get_db()
     user = await db.users.find_one({"_id": ObjectId(user_id)})
@@ -27,9 +33,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=404, detail="User not found")
 
     # Convert DB result into correct response structure
-    return {
+    principal = {
         "id": str(user["_id"]),
+        "user_id": str(user["_id"]),
         "email": user["email"],
         "full_name": user["full_name"],
         "role": user["role"],
     }
+
+    principal_cache.set(user_id, token, principal, token_exp=payload.get("exp"))
+    return principal
@@ -0,0 +1,344 @@
+"""
+Request & Database Metrics
+--------------------------
+- `TimingMiddleware` (ASGI): per-route latency histogram, in-flight
+  gauge, and for every request the number and total time of the Mongo
+  commands it issued (`Server-Timing: db;dur=...` header, and a warning
+  when a request issues more than `REQUEST_DB_COMMANDS_WARN` commands,
+  the signature of an N+1 lookup)
+- `CommandMetricsListener` (pymongo command listener): per command and
+  collection counts/durations, and slow-command logging with the filter
+  *shape* (values replaced by `?`, so no patient data reaches the logs)
+- `render_prometheus()`: everything above plus the `stats()` of
+  registered components in Prometheus text format, served at `/metrics`
+
+Commands are attributed to the request through a context variable;
+Motor runs pymongo calls on its executor with a copy of the caller's
+context, so the listener sees the request that issued each command.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_COMMAND_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+# --------------------------------------------------
+# Histogram
+# --------------------------------------------------
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le=_num(bound))} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le="+Inf")} {cumulative}')
+            lines.append(f"{self.name}_sum{base} {_num(series[-1])}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_num(value)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, **extra) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{v}"' for n, v in extra.items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# --------------------------------------------------
+# Metric Families
+# --------------------------------------------------
+request_latency = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+request_db_commands = Histogram(
+    "http_request_db_commands", "Mongo commands issued per request",
+    ("method", "route"), DB_COMMAND_BUCKETS,
+)
+request_db_seconds = Counter(
+    "http_request_db_seconds_total", "Time spent in Mongo commands by route",
+    ("method", "route"),
+)
+mongo_command_latency = Histogram(
+    "mongodb_command_duration_seconds", "Mongo command latency",
+    ("command", "collection"), LATENCY_BUCKETS,
+)
+mongo_command_failures = Counter(
+    "mongodb_command_failures_total", "Failed Mongo commands",
+    ("command", "collection"),
+)
+mongo_slow_commands = Counter(
+    "mongodb_slow_commands_total", "Mongo commands slower than SLOW_QUERY_MS",
+    ("command", "collection"),
+)
+
+_in_flight = 0
+
+
+# --------------------------------------------------
+# Per-request DB accounting
+# --------------------------------------------------
+class RequestDbStats:
+    __slots__ = ("commands", "seconds", "_lock")
+
+    def __init__(self):
+        self.commands = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.commands += 1
+            self.seconds += seconds
+
+
+_request_db: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar(
+    "request_db", default=None
+)
+
+
+# Where each command keeps its filter
+_FILTER_FIELDS = {
+    "find": lambda c: c.get("filter"),
+    "count": lambda c: c.get("query"),
+    "distinct": lambda c: c.get("query"),
+    "findAndModify": lambda c: c.get("query"),
+    "update": lambda c: (c.get("updates") or [{}])[0].get("q"),
+    "delete": lambda c: (c.get("deletes") or [{}])[0].get("q"),
+    "aggregate": lambda c: next(
+        (stage["$match"] for stage in c.get("pipeline", []) if "$match" in stage), None
+    ),
+}
+
+
+def query_shape(value):
+    """Keep keys and operators, replace every value with '?'."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, dict) for v in value):
+            return [query_shape(v) for v in value]
+        return ["?"]
+    return "?"
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+        self._started: Dict[Tuple[int, object], Tuple[str, str, Optional[dict], Optional[RequestDbStats]]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        command = event.command
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        filter_doc = None
+        if event.command_name in _FILTER_FIELDS:
+            try:
+                filter_doc = _FILTER_FIELDS[event.command_name](command)
+            except (AttributeError, IndexError, TypeError):
+                pass
+        with self._lock:
+            self._started[(event.request_id, event.connection_id)] = (
+                collection, event.database_name, filter_doc, _request_db.get()
+            )
+
+    def _finished(self, event, failed: bool):
+        with self._lock:
+            started = self._started.pop((event.request_id, event.connection_id), None)
+        if started is None:
+            return
+        collection, database_name, filter_doc, request_stats = started
+        seconds = event.duration_micros / 1_000_000
+        labels = (event.command_name, collection)
+
+        mongo_command_latency.observe(labels, seconds)
+        if failed:
+            mongo_command_failures.inc(labels)
+        if request_stats is not None:
+            request_stats.add(seconds)
+
+        if seconds * 1000 >= self.slow_ms:
+            mongo_slow_commands.inc(labels)
+            logger.warning(
+                "Slow Mongo command %s on %s.%s took %.1f ms; filter shape %s",
+                event.command_name, database_name, collection, seconds * 1000,
+                query_shape(filter_doc) if filter_doc is not None else None,
+            )
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+
+command_metrics = CommandMetricsListener(settings.SLOW_QUERY_MS)
+
+
+# --------------------------------------------------
+# Middleware
+# --------------------------------------------------
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _request_db.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.commands} commands", '
+                    f"app;dur={(time.perf_counter() - started) * 1000:.1f}".encode(),
+                ))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        _in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight -= 1
+            _request_db.reset(token)
+
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+
+            request_latency.observe((method, path, str(status)), elapsed)
+            request_db_commands.observe((method, path), stats.commands)
+            request_db_seconds.inc((method, path), stats.seconds)
+
+            if stats.commands > settings.REQUEST_DB_COMMANDS_WARN:
+                logger.warning(
+                    "%s %s issued %d Mongo commands (%.1f ms)",
+                    method, path, stats.commands, stats.seconds * 1000,
+                )
+
+
+# --------------------------------------------------
+# Component stats + Prometheus rendering
+# --------------------------------------------------
+_components: Dict[str, Callable[[], dict]] = {}
+
+
+def register_stats(name: str, stats: Callable[[], dict]):
+    """Expose a component's `stats()` numbers as gauges on /metrics."""
+    _components[name] = stats
+
+
+def _flatten(prefix: str, value, out: Dict[str, float]):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{key}", item, out)
+    elif isinstance(value, bool):
+        out[prefix] = int(value)
+    elif isinstance(value, (int, float)):
+        out[prefix] = value
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def render_prometheus() -> str:
+    lines = ["# TYPE http_requests_in_flight gauge", f"http_requests_in_flight {_in_flight}"]
+    for family in (
+        request_latency, request_db_commands, request_db_seconds,
+        mongo_command_latency, mongo_command_failures, mongo_slow_commands,
+    ):
+        lines.extend(family.render())
+
+    for component, stats in _components.items():
+        try:
+            values: Dict[str, float] = {}
+            _flatten(f"phrm_{component}", stats(), values)
+        except Exception:
+            logger.exception("Collecting %s stats failed", component)
+            continue
+        for name, value in values.items():
+            name = _metric_name(name)
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_num(value)}")
+
+    return "\n".join(lines) + "\n"
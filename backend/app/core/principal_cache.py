@@ -0,0 +1,125 @@
+"""
+Verified-principal cache
+------------------------
+Keeps the user document resolved by `get_current_user` in memory so an
+authenticated request does not pay a Mongo round trip before the handler
+runs.
+
+- Keyed by token `sub` + SHA-256 of the raw token
+- Bounded (LRU eviction) and TTL based, never outliving the token `exp`
+- `invalidate_user()` drops every cached token of a user; call it whenever
+  the user's role or profile changes
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+
+class PrincipalCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        # (user_id, token_hash) -> (expires_at, principal)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        # user_id -> token hashes currently cached for that user
+        self._by_user: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, user_id: str, token: str) -> Optional[dict]:
+        key = (user_id, self.token_hash(token))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, principal = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(principal)
+
+    def set(self, user_id: str, token: str, principal: dict, token_exp: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            # Never serve a principal for a token that has already expired
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+
+        key = (user_id, self.token_hash(token))
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, dict(principal))
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key[1])
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: str):
+        with self._lock:
+            for digest in self._by_user.pop(user_id, set()):
+                self._entries.pop((user_id, digest), None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+        digests = self._by_user.get(key[0])
+        if digests is not None:
+            digests.discard(key[1])
+            if not digests:
+                del self._by_user[key[0]]
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_user(user_id: str):
+    """Hook fired when a user's role or profile changes."""
+    principal_cache.invalidate_user(user_id)
@@ -1,18 +1,29 @@
 from typing import List
 from fastapi import Depends, HTTPException, status
 
-from app.core.auth import get_current_user
+from app.core.deps import get_current_user
 
 
 class RoleChecker:
-    def __init__(self, allowed_roles: List[str]):
+    """
+    Dependency that authorises the caller by role and hands the already
+    loaded user document to the handler, so routers never re-read `users`
+    just to check `role`.
+    """
+
+    def __init__(
+        self,
+        allowed_roles: List[str],
+        detail: str = "You do not have permission to access this resource.",
+    ):
         self.allowed_roles = allowed_roles
+        self.detail = detail
 
     async def __call__(self, current_user: dict = Depends(get_current_user)):
         user_role = current_user.get("role")
         if user_role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have permission to access this resource.",
+                detail=self.detail,
             )
         return current_user
@@ -1,5 +1,10 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import HTTPException
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.config import settings
@@ -32,3 +37,107 @@ def decode_access_token(token: str):
         return payload
     except JWTError:
         return None
+
+
+# --------------------------------------------------
+# Off-loop password hashing
+# --------------------------------------------------
+class PasswordWorkerPool:
+    """
+    Runs bcrypt work on a dedicated, size-limited thread pool so async
+    handlers never block the event loop. bcrypt releases the GIL, so
+    threads give real parallelism here.
+
+    At most `workers + max_queue` jobs may be in flight; anything beyond
+    that is rejected with 429 instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-worker",
+            )
+        return self._executor
+
+    def _timed(self, submitted_at: float, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            waited = started - submitted_at
+            took = finished - started
+            with self._lock:
+                self.completed += 1
+                self.queue_wait_total += waited
+                self.queue_wait_max = max(self.queue_wait_max, waited)
+                self.hash_time_total += took
+                self.hash_time_max = max(self.hash_time_max, took)
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many authentication requests, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._in_flight += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), self._timed, time.perf_counter(), fn, *args
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_seconds_total": self.queue_wait_total,
+                "queue_wait_seconds_max": self.queue_wait_max,
+                "hash_seconds_total": self.hash_time_total,
+                "hash_seconds_max": self.hash_time_max,
+            }
+
+
+password_pool = PasswordWorkerPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,238 @@
+"""
+Index registry
+--------------
+Declarative list of the indexes every collection needs. `ensure_indexes`
+runs at startup from `connect_to_mongo`; `create_indexes` is idempotent,
+so re-running against an up-to-date database is a no-op. Time-series
+collections in `TIME_SERIES` are created first, since their options
+cannot be added to an existing collection.
+
+CLI:
+    python -m app.db.indexes diff             # show missing / changed / extra
+    python -m app.db.indexes apply            # create missing and changed
+    python -m app.db.indexes apply --drop-extra
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+TIME_SERIES: Dict[str, dict] = {
+    "vitals": {
+        "timeField": "timestamp",
+        "metaField": "meta",
+        "granularity": "minutes",
+    },
+}
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # register/login look users up by email and assume it is unique
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "patient_profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "doctor_profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "family_links": [
+        IndexModel(
+            [("family_user_id", ASCENDING), ("patient_user_id", ASCENDING)],
+            name="family_patient_unique",
+            unique=True,
+        ),
+        # "who is linked to this patient" lookups
+        IndexModel([("patient_user_id", ASCENDING)], name="patient_user_id"),
+    ],
+    "prescriptions": [
+        IndexModel(
+            [("patient_user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+            name="patient_date",
+        ),
+        IndexModel([("doctor_user_id", ASCENDING)], name="doctor_user_id"),
+    ],
+    "vitals": [
+        IndexModel(
+            [("meta.patient_id", ASCENDING), ("meta.type", ASCENDING), ("timestamp", ASCENDING)],
+            name="patient_type_time",
+        ),
+    ],
+    "vitals_rollups": [
+        IndexModel(
+            [("patient_id", ASCENDING), ("type", ASCENDING),
+             ("resolution", ASCENDING), ("bucket", ASCENDING)],
+            name="patient_type_resolution_bucket_unique",
+            unique=True,
+        ),
+    ],
+    "task_history": [
+        # Makes awards idempotent
+        IndexModel([("award_key", ASCENDING)], name="award_key_unique", unique=True),
+        IndexModel(
+            [("patient_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="patient_time",
+        ),
+        # Nightly "who was active on this day" scan
+        IndexModel([("timestamp", ASCENDING)], name="timestamp"),
+        # Entries whose wallet $inc has not landed yet (repair job)
+        IndexModel(
+            [("wallet_applied", ASCENDING), ("_id", ASCENDING)],
+            name="wallet_pending",
+            partialFilterExpression={"wallet_applied": False},
+        ),
+    ],
+    "symptom_records": [
+        IndexModel([("patient_id", ASCENDING), ("timestamp", DESCENDING)], name="patient_time"),
+    ],
+    "clinic_staff": [
+        IndexModel(
+            [("doctor_user_id", ASCENDING), ("clinic_id", ASCENDING)],
+            name="doctor_clinic_unique",
+            unique=True,
+        ),
+    ],
+    "points_wallets": [
+        IndexModel([("patient_id", ASCENDING)], name="patient_id_unique", unique=True),
+    ],
+}
+
+
+# --------------------------------------------------
+# Diff / apply
+# --------------------------------------------------
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _spec(document: dict) -> dict:
+    key = document["key"]
+    key = list(key.items()) if hasattr(key, "items") else [tuple(k) for k in key]
+
+    spec = {"key": [(field, int(direction)) for field, direction in key]}
+    for option in _COMPARED_OPTIONS:
+        if document.get(option) not in (None, False):
+            spec[option] = document[option]
+    return spec
+
+
+async def diff_indexes(db) -> Dict[str, dict]:
+    """
+    Compare the registry with what the database has.
+
+    Returns {collection: {"missing": [...], "changed": [...], "extra": [...]}}
+    with index names; collections already in sync are omitted.
+    """
+    report = {}
+
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing.pop("_id_", None)
+
+        missing, changed = [], []
+        for model in models:
+            wanted = model.document
+            current = existing.pop(wanted["name"], None)
+            if current is None:
+                missing.append(wanted["name"])
+            elif _spec(current) != _spec(wanted):
+                changed.append(wanted["name"])
+
+        extra = list(existing)
+        if missing or changed or extra:
+            report[collection] = {"missing": missing, "changed": changed, "extra": extra}
+
+    return report
+
+
+async def apply_indexes(db, drop_extra: bool = False) -> Dict[str, dict]:
+    await ensure_time_series(db)
+    report = await diff_indexes(db)
+
+    for collection, changes in report.items():
+        models = {m.document["name"]: m for m in INDEXES[collection]}
+
+        for name in changes["changed"]:
+            await db[collection].drop_index(name)
+        for name in changes["missing"] + changes["changed"]:
+            await db[collection].create_indexes([models[name]])
+
+        if drop_extra:
+            for name in changes["extra"]:
+                await db[collection].drop_index(name)
+
+    return report
+
+
+async def ensure_time_series(db):
+    existing = set(await db.list_collection_names())
+    for collection, options in TIME_SERIES.items():
+        if collection in existing:
+            continue
+        try:
+            await db.create_collection(collection, timeseries=options)
+        except (CollectionInvalid, OperationFailure) as exc:
+            logger.warning("Could not create time-series collection %s: %s", collection, exc)
+
+
+async def ensure_indexes(db):
+    """
+    Startup hook: create every registered index. Failures (e.g. existing
+    duplicate emails blocking a unique index) are logged, not fatal, so
+    the API still comes up; fix the data and run the CLI. Indexes are
+    built one at a time so a failing one does not block the others.
+    """
+    await ensure_time_series(db)
+
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as exc:
+                logger.warning("Could not build index %s on %s: %s",
+                               model.document["name"], collection, exc)
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def _print_report(report: Dict[str, dict]):
+    if not report:
+        print("Indexes are up to date.")
+        return
+    for collection, changes in report.items():
+        for kind in ("missing", "changed", "extra"):
+            for name in changes[kind]:
+                print(f"{collection:<20} {kind:<8} {name}")
+
+
+async def _main(argv=None):
+    from app.config import settings
+    from app.db.mongodb import build_client
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.indexes")
+    parser.add_argument("command", choices=["diff", "apply"])
+    parser.add_argument("--drop-extra", action="store_true",
+                        help="drop indexes that are not in the registry")
+    args = parser.parse_args(argv)
+
+    client = build_client()
+    db = client[settings.DATABASE_NAME]
+    try:
+        if args.command == "diff":
+            _print_report(await diff_indexes(db))
+        else:
+            _print_report(await apply_indexes(db, drop_extra=args.drop_extra))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,14 +1,127 @@
+import threading
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, monitoring
 from app.config import settings
+from app.core.metrics import command_metrics
+from app.db.indexes import ensure_indexes
 
 client = None
 database = None   # <-- consistently use this name
 
+_routed_databases = {}
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+# --------------------------------------------------
+# Connection pool metrics
+# --------------------------------------------------
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Counts pool activity from pymongo's connection-pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total = 0.0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            # `duration` (time spent waiting for the connection) is pymongo >= 4.7
+            self.checkout_wait_total += getattr(event, "duration", 0.0) or 0.0
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "utilisation": (
+                    self.checked_out / settings.MONGO_MAX_POOL_SIZE
+                    if settings.MONGO_MAX_POOL_SIZE else 0.0
+                ),
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_wait_seconds_total": self.checkout_wait_total,
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetricsListener()
+
+
+def build_client(event_listeners=None) -> AsyncIOMotorClient:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "event_listeners": [pool_metrics, *(event_listeners or [])],
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+
+    return AsyncIOMotorClient(settings.MONGODB_URI, **options)
+
 
 async def connect_to_mongo():
     global client, database
-    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    client = build_client([command_metrics] if settings.METRICS_ENABLED else None)
     database = client[settings.DATABASE_NAME]   # <-- consistent
+    _routed_databases.clear()
+    await ensure_indexes(database)
 
 
 async def close_mongo_connection():
@@ -22,3 +135,21 @@ def get_db():
     if database is None:
         raise Exception("Database not initialized")
     return database
+
+
+def get_routed_db(route: str):
+    """
+    Database handle for `route`. When the route has an entry in
+    settings.MONGO_READ_PREFERENCES, the handle reads with that
+    preference (e.g. secondaries); writes always go to the primary.
+    """
+    db = get_db()
+    mode = settings.MONGO_READ_PREFERENCES.get(route)
+    if not mode or mode == "primary":
+        return db
+
+    routed = _routed_databases.get(route)
+    if routed is None or routed.client is not db.client:
+        routed = db.with_options(read_preference=READ_PREFERENCES[mode])
+        _routed_databases[route] = routed
+    return routed
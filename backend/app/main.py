@@ -1,5 +1,22 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
-from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_db, pool_metrics
+from app.config import settings
+from app.core.metrics import TimingMiddleware, register_stats
+from app.core.principal_cache import principal_cache
+from app.core.security import password_pool
+from app.ai.chatbot_service import chat_service
+from app.ai.gamification_service import points_ledger
+from app.ai.health_ai import anomaly_detector
+from app.ai.leaderboard_service import leaderboards
+from app.ai.notification_service import anomaly_listener, notifier
+from app.ai.pharmacy_catalog import watch_catalog
+from app.ai.reminder_service import reminder_engine
+from app.ai.symptom_kb import watch_knowledge_base
+from app.ai.symptoms import result_cache
+from app.ai.vitals_service import vitals_buffer
 from app.api.auth import router as auth_router
 from app.api.patients import router as patients_router
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,8 +27,16 @@ from app.api.family import router as family_router
 from app.api.prescriptions import router as prescriptions_router
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.symptoms import router as symptoms_router
-#from app.api.ai import router as ai_router
+from app.api.vitals import router as vitals_router
+from app.api.gamification import router as gamification_router
+from app.api.pharmacy import router as pharmacy_router
+from app.api.dashboard import router as dashboard_router
+from app.api.ai import router as ai_router
+from app.api.ai_proxy import ai_proxy
+from app.api.metrics import router as metrics_router
+
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -24,10 +49,67 @@ origins = [
 @app.on_event("startup")
 async def startup():
     await connect_to_mongo()
+    await ai_proxy.start()
+    notifier.start()
+    vitals_buffer.start()
+
+    await anomaly_detector.load(get_db())
+    if anomaly_listener not in anomaly_detector.listeners:
+        anomaly_detector.listeners.append(anomaly_listener)
+    app.state.anomaly_snapshots = asyncio.create_task(
+        anomaly_detector.run_snapshots(get_db(), settings.ANOMALY_SNAPSHOT_SECONDS)
+    )
+
+    await reminder_engine.rebuild(get_db())
+    reminder_engine.start()
+    app.state.streak_job = asyncio.create_task(points_ledger.run_nightly(get_db()))
+    app.state.ledger_repairs = asyncio.create_task(
+        points_ledger.run_repairs(get_db(), settings.GAMIFICATION_REPAIR_SECONDS)
+    )
+
+    await leaderboards.load(get_db())
+    if leaderboards.set_points not in points_ledger.listeners:
+        points_ledger.listeners.append(leaderboards.set_points)
+    app.state.leaderboard_snapshots = asyncio.create_task(
+        leaderboards.run_snapshots(get_db(), settings.LEADERBOARD_SNAPSHOT_SECONDS)
+    )
+
+    if settings.SYMPTOM_KB_RELOAD_SECONDS > 0:
+        app.state.kb_watcher = asyncio.create_task(
+            watch_knowledge_base(settings.SYMPTOM_KB_RELOAD_SECONDS)
+        )
+    if settings.PHARMACY_CATALOG_RELOAD_SECONDS > 0:
+        app.state.catalog_watcher = asyncio.create_task(
+            watch_catalog(settings.PHARMACY_CATALOG_RELOAD_SECONDS)
+        )
 
 @app.on_event("shutdown")
 async def shutdown():
+    kb_watcher = getattr(app.state, "kb_watcher", None)
+    if kb_watcher:
+        kb_watcher.cancel()
+    catalog_watcher = getattr(app.state, "catalog_watcher", None)
+    if catalog_watcher:
+        catalog_watcher.cancel()
+    app.state.anomaly_snapshots.cancel()
+    await reminder_engine.stop()
+    app.state.streak_job.cancel()
+    app.state.ledger_repairs.cancel()
+    app.state.leaderboard_snapshots.cancel()
+    # A failed snapshot is logged; the remaining steps must still run
+    try:
+        await leaderboards.snapshot(get_db())
+    except Exception:
+        logger.exception("Final leaderboard snapshot failed")
+    await vitals_buffer.stop()
+    try:
+        await anomaly_detector.snapshot(get_db())
+    except Exception:
+        logger.exception("Final anomaly state snapshot failed")
+    await notifier.stop()
     await close_mongo_connection()
+    await ai_proxy.stop()
+    password_pool.shutdown()
 
 def custom_openapi():
     if app.openapi_schema:
@@ -62,8 +144,14 @@ app.include_router(patients_router)
 app.include_router(doctor_router)
 app.include_router(family_router)
 app.include_router(prescriptions_router)
-#app.include_router(ai_router)
+app.include_router(ai_router)
 app.include_router(symptoms_router)
+app.include_router(vitals_router)
+app.include_router(gamification_router)
+app.include_router(pharmacy_router)
+app.include_router(dashboard_router)
+if settings.METRICS_ENABLED and settings.METRICS_TOKEN:
+    app.include_router(metrics_router)
 
 app.include_router(patients_router, prefix="/patients", tags=["Patients"])
 
@@ -75,4 +163,22 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
-)
\ No newline at end of file
+)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware)
+    for name, component in {
+        "principal_cache": principal_cache,
+        "password_pool": password_pool,
+        "mongo_pool": pool_metrics,
+        "symptom_cache": result_cache,
+        "vitals_buffer": vitals_buffer,
+        "anomaly_detector": anomaly_detector,
+        "notifier": notifier,
+        "reminders": reminder_engine,
+        "points_ledger": points_ledger,
+        "leaderboards": leaderboards,
+        "chatbot": chat_service,
+        "ai_proxy": ai_proxy,
+    }.items():
+        register_stats(name, component.stats)
@@ -0,0 +1,67 @@
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+
+# ----------- OBJECT IDS -----------
+
+def to_object_ids(ids) -> list:
+    """Convert string ids to ObjectId, skipping anything malformed."""
+    return [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+
+
+def serialize_doc(doc: dict) -> dict:
+    """Make a Mongo document JSON-safe: ObjectId -> str, datetime -> ISO 8601."""
+    out = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            out[key] = str(value)
+        elif isinstance(value, datetime):
+            out[key] = value.isoformat()
+        elif isinstance(value, dict):
+            out[key] = serialize_doc(value)
+        else:
+            out[key] = value
+    return out
+
+
+# ----------- PAGINATION CURSORS -----------
+
+def encode_cursor(values: dict) -> str:
+    """
+    Opaque, URL-safe keyset cursor. ObjectIds and datetimes are tagged so
+    `decode_cursor` can restore them for use in Mongo range filters.
+    """
+    encoded = {}
+    for key, value in values.items():
+        if isinstance(value, ObjectId):
+            encoded[key] = {"$oid": str(value)}
+        elif isinstance(value, datetime):
+            encoded[key] = {"$date": value.isoformat()}
+        else:
+            encoded[key] = value
+
+    raw = json.dumps(encoded, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        encoded = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+        values = {}
+        for key, value in encoded.items():
+            if isinstance(value, dict) and "$oid" in value:
+                values[key] = ObjectId(value["$oid"])
+            elif isinstance(value, dict) and "$date" in value:
+                values[key] = datetime.fromisoformat(value["$date"])
+            else:
+                values[key] = value
+        return values
+
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
@@ -0,0 +1,21 @@
+"""
+Benchmarks
+----------
+Micro-benchmarks and in-process load tests for the API hot paths, run
+from `backend/`:
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks run                       # everything, mongomock-motor
+    python -m benchmarks run --suite symptoms -k input=20
+    python -m benchmarks run --mongo-uri mongodb://localhost:27017 --json head.json
+
+Every benchmark reports throughput and p50/p90/p99 latency. To catch
+regressions between commits, save a result file on each and compare:
+
+    git checkout main && python -m benchmarks run --json base.json
+    git checkout -    && python -m benchmarks run --json head.json
+    python -m benchmarks compare base.json head.json --threshold 0.10
+
+`compare` exits with status 1 when any benchmark's p50 (or `--metric`)
+got worse by more than the threshold.
+"""
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SUITES = ("symptoms", "auth", "api")
+
+
+def _sizes(value: str):
+    """'50x150,1000x1000' -> [(50, 150), (1000, 1000)]"""
+    try:
+        return [tuple(int(n) for n in part.split("x", 1)) for part in value.split(",") if part]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected CONDITIONSxSYMPTOMS[,...], got {value!r}")
+
+
+def _ints(value: str):
+    try:
+        return [int(n) for n in value.split(",") if n]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N[,N...], got {value!r}")
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run benchmarks and print a report")
+    run.add_argument("--suite", action="append", choices=SUITES,
+                     help="suite to run (repeatable; default: all)")
+    run.add_argument("-k", "--filter", default="",
+                     help="only run benchmarks whose name contains this")
+    run.add_argument("--mongo-uri",
+                     help="benchmark against this MongoDB instead of mongomock-motor")
+    run.add_argument("--database", default="phrm_bench",
+                     help="database to create, seed and DROP (default: phrm_bench)")
+    run.add_argument("--catalogs", type=_sizes, default=_sizes("50x150,1000x1000,5000x2000"),
+                     help="symptom KB sizes as CONDITIONSxSYMPTOMS")
+    run.add_argument("--input-sizes", type=_ints, default=_ints("1,5,20"),
+                     help="symptoms per analyze_symptoms call")
+    run.add_argument("--links", type=int, default=50,
+                     help="patients linked to the family member")
+    run.add_argument("--prescriptions", type=int, default=200,
+                     help="prescriptions of the benchmark patient")
+    run.add_argument("--page-size", type=int, default=20,
+                     help="limit for /prescriptions/patient/{id}")
+    run.add_argument("--concurrency", type=int, default=4,
+                     help="concurrent requests for HTTP benchmarks")
+    run.add_argument("--min-time", type=float, default=1.0,
+                     help="seconds to run each benchmark for (at least)")
+    run.add_argument("--json", dest="json_path",
+                     help="also write results to this file (input for `compare`)")
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument("--metric", choices=["p50", "p90", "p99", "mean", "throughput"], default="p50")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="relative change counted as a regression (default: 0.10)")
+
+    return parser
+
+
+# --------------------------------------------------
+# run
+# --------------------------------------------------
+def _configure_environment(args):
+    """Settings are read at import time, so this runs before any `app` import."""
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ["MONGODB_URI"] = args.mongo_uri or "mongodb://localhost:27017"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    # Log lines would interleave with the report
+    logging.basicConfig(level=logging.ERROR)
+
+
+async def _run(args) -> int:
+    _configure_environment(args)
+
+    import httpx
+
+    from app.main import app
+    from benchmarks import fixtures, suites
+    from benchmarks.harness import HEADER, environment, run_all, save_results
+
+    if args.links < 1:
+        raise SystemExit("--links must be at least 1")
+    selected = set(args.suite or SUITES)
+
+    await fixtures.connect(args.mongo_uri)
+    try:
+        data = await fixtures.seed(args.links, args.prescriptions)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            with tempfile.TemporaryDirectory(prefix="phrm-bench-") as workdir:
+                benchmarks = []
+                if "symptoms" in selected:
+                    benchmarks += suites.symptom_benchmarks(args.catalogs, args.input_sizes, Path(workdir))
+                if "auth" in selected:
+                    benchmarks += suites.auth_benchmarks(data, client, args.concurrency)
+                if "api" in selected:
+                    benchmarks += suites.api_benchmarks(data, client, args.concurrency, args.page_size)
+
+                benchmarks = [b for b in benchmarks if args.filter in b.name]
+                if not benchmarks:
+                    print("No benchmarks match.", file=sys.stderr)
+                    return 1
+
+                print(HEADER)
+                print("-" * len(HEADER), flush=True)
+                results = await run_all(
+                    benchmarks, args.min_time, progress=lambda row: print(row, flush=True)
+                )
+    finally:
+        await fixtures.disconnect(args.mongo_uri)
+
+    if args.json_path:
+        meta = environment(
+            backend="mongodb" if args.mongo_uri else "mongomock",
+            links=args.links,
+            prescriptions=args.prescriptions,
+            concurrency=args.concurrency,
+        )
+        save_results(args.json_path, results, meta)
+        print(f"\nWrote {len(results)} results to {args.json_path}")
+    return 0
+
+
+# --------------------------------------------------
+# compare
+# --------------------------------------------------
+def _compare(args) -> int:
+    from benchmarks.harness import compare_results, format_comparison, load_results
+
+    base_meta, base = load_results(args.base)
+    head_meta, head = load_results(args.head)
+
+    print(f"base: {args.base} ({base_meta.get('commit')}, {base_meta.get('backend')})")
+    print(f"head: {args.head} ({head_meta.get('commit')}, {head_meta.get('backend')})")
+    if base_meta.get("backend") != head_meta.get("backend"):
+        print("warning: results were measured against different database backends")
+    print()
+
+    comparison = compare_results(base, head, args.metric, args.threshold)
+    print(format_comparison(comparison))
+    return 1 if comparison.regressions else 0
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    if args.command == "compare":
+        return _compare(args)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Benchmark Fixtures
+------------------
+Database connection and seeded data for the API benchmarks.
+
+- default: an in-process `mongomock-motor` database (no server needed;
+  absolute numbers are dominated by mongomock, so only compare runs
+  made with the same backend)
+- `--mongo-uri`: a real MongoDB; the benchmark database is dropped,
+  indexed with the app's registry and seeded before the run, and
+  dropped again afterwards
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List
+
+from jose import jwt
+
+from app.config import settings
+from app.core.security import hash_password
+from app.db import mongodb
+from app.db.indexes import ensure_indexes
+
+PASSWORD = "bench-password"
+
+
+@dataclass
+class SeededData:
+    patient_id: str
+    family_id: str
+    doctor_id: str
+    patient_token: str
+    family_token: str
+    linked_patient_ids: List[str] = field(default_factory=list)
+    prescriptions: int = 0
+
+
+def make_token(user_id: str, email: str) -> str:
+    """Same claims and key as /auth/login issues."""
+    return jwt.encode(
+        {"sub": user_id, "email": email, "exp": datetime.utcnow() + timedelta(hours=24)},
+        settings.SECRET_KEY,
+        algorithm="HS256",
+    )
+
+
+# --------------------------------------------------
+# Database
+# --------------------------------------------------
+async def connect(mongo_uri: str | None):
+    """Point the app's database handle at a clean benchmark database."""
+    if mongo_uri:
+        mongodb.client = mongodb.build_client()
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit(
+                "mongomock-motor is not installed; pip install -r benchmarks/requirements.txt "
+                "or pass --mongo-uri"
+            )
+        mongodb.client = AsyncMongoMockClient()
+
+    await mongodb.client.drop_database(settings.DATABASE_NAME)
+    mongodb.database = mongodb.client[settings.DATABASE_NAME]
+    mongodb._routed_databases.clear()
+    if mongo_uri:
+        await ensure_indexes(mongodb.database)
+
+
+async def disconnect(mongo_uri: str | None):
+    if mongodb.client is None:
+        return
+    if mongo_uri:
+        await mongodb.client.drop_database(settings.DATABASE_NAME)
+    mongodb.client.close()
+    mongodb.client = mongodb.database = None
+
+
+# --------------------------------------------------
+# Seeding
+# --------------------------------------------------
+async def seed(links: int, prescriptions: int) -> SeededData:
+    """
+    One patient with `prescriptions` prescriptions, one family member
+    linked to that patient plus `links - 1` other patients, one doctor.
+    Every user shares a single bcrypt hash of PASSWORD.
+    """
+    db = mongodb.get_db()
+    hashed = hash_password(PASSWORD)
+
+    def user(email: str, role: str) -> dict:
+        return {"email": email, "full_name": email.split("@")[0], "password": hashed, "role": role}
+
+    patient = await db.users.insert_one(user("bench-patient@example.com", "patient"))
+    family = await db.users.insert_one(user("bench-family@example.com", "family"))
+    doctor = await db.users.insert_one(user("bench-doctor@example.com", "doctor"))
+    patient_id, family_id, doctor_id = (
+        str(r.inserted_id) for r in (patient, family, doctor)
+    )
+
+    linked = [patient_id]
+    if links > 1:
+        others = await db.users.insert_many([
+            user(f"bench-patient-{i}@example.com", "patient") for i in range(1, links)
+        ])
+        linked += [str(i) for i in others.inserted_ids]
+
+    await db.family_links.insert_many([
+        {"family_user_id": family_id, "patient_user_id": pid, "relation": "relative"}
+        for pid in linked[:links]
+    ])
+
+    if prescriptions:
+        now = datetime.utcnow()
+        await db.prescriptions.insert_many([
+            {
+                "doctor_user_id": doctor_id,
+                "patient_user_id": patient_id,
+                "diagnosis": f"Diagnosis {i}",
+                "medicines": ["Dolo 650mg Tablet", "Azithromycin 500mg Tablet"],
+                "notes": "After meals",
+                "schedule": None,
+                "date": now - timedelta(hours=i),
+            }
+            for i in range(prescriptions)
+        ])
+
+    return SeededData(
+        patient_id=patient_id,
+        family_id=family_id,
+        doctor_id=doctor_id,
+        patient_token=make_token(patient_id, "bench-patient@example.com"),
+        family_token=make_token(family_id, "bench-family@example.com"),
+        linked_patient_ids=linked[:links],
+        prescriptions=prescriptions,
+    )
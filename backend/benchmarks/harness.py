@@ -0,0 +1,267 @@
+"""
+Benchmark Harness
+-----------------
+Runs `Benchmark`s, summarises their latency samples into `Result`s
+(throughput, mean, p50/p90/p99, max), prints reports, and saves/loads
+and compares JSON result files.
+
+A benchmark is any zero-argument callable, sync or async. Each one is
+warmed up, then called by `concurrency` workers until it has run for
+`min_time` seconds and at least `min_iterations` times. Latency is the
+wall time of a single call; throughput is completed calls per second of
+the whole measurement, so for concurrent benchmarks it reflects how
+well the code under test overlaps.
+"""
+
+import asyncio
+import inspect
+import json
+import math
+import platform
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+RESULT_FORMAT_VERSION = 1
+
+
+@dataclass
+class Benchmark:
+    name: str
+    fn: Callable
+    concurrency: int = 1
+    min_time: float = 1.0
+    min_iterations: int = 50
+    max_iterations: int = 1_000_000
+    warmup: int = 5
+    setup: Optional[Callable] = None
+    teardown: Optional[Callable] = None
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    concurrency: int
+    seconds: float
+    throughput: float
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_samples(cls, bench: Benchmark, samples: List[float], seconds: float) -> "Result":
+        samples = sorted(samples)
+        return cls(
+            name=bench.name,
+            iterations=len(samples),
+            concurrency=bench.concurrency,
+            seconds=seconds,
+            throughput=len(samples) / seconds if seconds else 0.0,
+            mean=sum(samples) / len(samples),
+            p50=percentile(samples, 0.50),
+            p90=percentile(samples, 0.90),
+            p99=percentile(samples, 0.99),
+            max=samples[-1],
+        )
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    rank = max(1, math.ceil(q * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+# --------------------------------------------------
+# Running
+# --------------------------------------------------
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def run_benchmark(bench: Benchmark, time_scale: float = 1.0) -> Result:
+    if bench.setup:
+        await _maybe_await(bench.setup())
+    try:
+        for _ in range(bench.warmup):
+            await _maybe_await(bench.fn())
+
+        samples: List[float] = []
+        min_time = bench.min_time * time_scale
+        started = time.perf_counter()
+        deadline = started + min_time
+
+        def more() -> bool:
+            if len(samples) >= bench.max_iterations:
+                return False
+            return len(samples) < bench.min_iterations or time.perf_counter() < deadline
+
+        async def worker():
+            fn = bench.fn
+            while more():
+                t0 = time.perf_counter()
+                value = fn()
+                if inspect.isawaitable(value):
+                    await value
+                samples.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(worker() for _ in range(bench.concurrency)))
+        return Result.from_samples(bench, samples, time.perf_counter() - started)
+    finally:
+        if bench.teardown:
+            await _maybe_await(bench.teardown())
+
+
+async def run_all(benchmarks: List[Benchmark], time_scale: float = 1.0, progress=print) -> List[Result]:
+    results = []
+    for bench in benchmarks:
+        result = await run_benchmark(bench, time_scale)
+        results.append(result)
+        if progress:
+            progress(format_row(result))
+    return results
+
+
+# --------------------------------------------------
+# Reporting
+# --------------------------------------------------
+def format_duration(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+HEADER = f"{'benchmark':<58} {'ops/s':>10} {'p50':>10} {'p90':>10} {'p99':>10} {'n':>8}"
+
+
+def format_row(result: Result) -> str:
+    return (
+        f"{result.name:<58} {result.throughput:>10.1f} "
+        f"{format_duration(result.p50):>10} {format_duration(result.p90):>10} "
+        f"{format_duration(result.p99):>10} {result.iterations:>8}"
+    )
+
+
+def _git_revision() -> Dict[str, Optional[str]]:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True, timeout=10
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def environment(**extra) -> dict:
+    return {
+        "format": RESULT_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **_git_revision(),
+        **extra,
+    }
+
+
+def save_results(path, results: List[Result], meta: dict):
+    payload = {"meta": meta, "results": [asdict(r) for r in results]}
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def load_results(path) -> tuple:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    if payload.get("meta", {}).get("format") != RESULT_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported result format")
+    return payload["meta"], [Result(**r) for r in payload["results"]]
+
+
+# --------------------------------------------------
+# Comparing
+# --------------------------------------------------
+@dataclass
+class Change:
+    name: str
+    base: float
+    head: float
+    ratio: float
+    regression: bool
+
+
+@dataclass
+class Comparison:
+    metric: str
+    threshold: float
+    changes: List[Change] = field(default_factory=list)
+    only_base: List[str] = field(default_factory=list)
+    only_head: List[str] = field(default_factory=list)
+
+    @property
+    def regressions(self) -> List[Change]:
+        return [c for c in self.changes if c.regression]
+
+
+def compare_results(base: List[Result], head: List[Result], metric: str = "p50", threshold: float = 0.10) -> Comparison:
+    """
+    Pair results by name. A latency metric regresses when head is more than
+    `threshold` slower than base; throughput when it drops by more than that.
+    """
+    base_by_name = {r.name: r for r in base}
+    head_by_name = {r.name: r for r in head}
+    comparison = Comparison(
+        metric=metric,
+        threshold=threshold,
+        only_base=[n for n in base_by_name if n not in head_by_name],
+        only_head=[n for n in head_by_name if n not in base_by_name],
+    )
+
+    for name, base_result in base_by_name.items():
+        head_result = head_by_name.get(name)
+        if head_result is None:
+            continue
+        before = getattr(base_result, metric)
+        after = getattr(head_result, metric)
+        ratio = after / before if before else math.inf
+        if metric == "throughput":
+            regression = ratio < 1 - threshold
+        else:
+            regression = ratio > 1 + threshold
+        comparison.changes.append(Change(name, before, after, ratio, regression))
+
+    return comparison
+
+
+def format_comparison(comparison: Comparison) -> str:
+    fmt = (lambda v: f"{v:.1f}") if comparison.metric == "throughput" else format_duration
+    lines = [
+        f"{'benchmark':<58} {'base':>10} {'head':>10} {'change':>8}",
+        "-" * 90,
+    ]
+    for change in comparison.changes:
+        flag = "  REGRESSION" if change.regression else ""
+        lines.append(
+            f"{change.name:<58} {fmt(change.base):>10} {fmt(change.head):>10} "
+            f"{(change.ratio - 1) * 100:>+7.1f}%{flag}"
+        )
+    for name in comparison.only_base:
+        lines.append(f"{name:<58} (missing from head)")
+    for name in comparison.only_head:
+        lines.append(f"{name:<58} (new)")
+
+    lines.append("")
+    lines.append(
+        f"{len(comparison.regressions)} regression(s) in {comparison.metric} "
+        f"beyond {comparison.threshold:.0%}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,162 @@
+"""
+Benchmark Suites
+----------------
+- `symptoms`: `analyze_symptoms` on synthetic knowledge bases of
+  increasing size (conditions x symptoms) and inputs of increasing length
+- `auth`: JWT decode, `get_current_user` with a warm and a cold
+  principal cache, and bcrypt-bound `POST /auth/login`
+- `api`: `GET /family/my-patients` and `GET /prescriptions/patient/{id}`
+  through the full ASGI stack (middleware, dependencies, serialisation)
+
+HTTP benchmarks go through `httpx.ASGITransport`, so they measure the
+app itself without a server or sockets.
+"""
+
+import itertools
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+from jose import jwt
+
+from app.ai import symptom_kb
+from app.ai.symptom_kb import CompiledSymptomModel, reload_knowledge_base, save_binary_knowledge_base
+from app.ai.symptoms import analyze_symptoms
+from app.config import settings
+from app.core.deps import get_current_user
+from app.core.principal_cache import principal_cache
+
+from benchmarks.fixtures import PASSWORD, SeededData
+from benchmarks.harness import Benchmark
+
+SYMPTOMS_PER_CONDITION = 8
+INPUT_VARIANTS = 64
+
+
+# --------------------------------------------------
+# Symptom analysis
+# --------------------------------------------------
+def synthetic_model(conditions: int, symptoms: int, seed: int = 0) -> CompiledSymptomModel:
+    """Sparse random weights: every condition uses a few symptoms, weighted 1-5."""
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((conditions, symptoms), dtype=np.float64)
+    per_row = min(SYMPTOMS_PER_CONDITION, symptoms)
+    for row in range(conditions):
+        cols = rng.choice(symptoms, size=per_row, replace=False)
+        weights[row, cols] = rng.integers(1, 6, size=per_row)
+
+    symptom_names = [f"symptom {i}" for i in range(symptoms)]
+    return CompiledSymptomModel(
+        [f"condition {i}" for i in range(conditions)],
+        symptom_names,
+        weights,
+        high_risk_symptoms=symptom_names[: max(1, symptoms // 100)],
+        version=f"bench-{conditions}x{symptoms}",
+    )
+
+
+def symptom_benchmarks(catalogs: List[Tuple[int, int]], input_sizes: List[int], workdir: Path) -> List[Benchmark]:
+    """
+    One benchmark per (catalog, input size). Each catalog is written in
+    the binary KB format and swapped in with `reload_knowledge_base`, the
+    same path production takes; the original KB is restored afterwards.
+    """
+    original = symptom_kb._active_path
+    benchmarks = []
+
+    for conditions, symptoms in catalogs:
+        path = workdir / f"kb-{conditions}x{symptoms}"
+        save_binary_knowledge_base(synthetic_model(conditions, symptoms), path)
+
+        rng = random.Random(conditions * 31 + symptoms)
+        vocabulary = [f"symptom {i}" for i in range(symptoms)]
+        for size in input_sizes:
+            inputs = itertools.cycle([
+                rng.sample(vocabulary, min(size, symptoms)) for _ in range(INPUT_VARIANTS)
+            ])
+            benchmarks.append(Benchmark(
+                name=f"symptoms.analyze[catalog={conditions}x{symptoms},input={size}]",
+                fn=lambda inputs=inputs: analyze_symptoms(next(inputs)),
+                # one pass over the inputs fills the normaliser cache
+                warmup=INPUT_VARIANTS,
+                setup=lambda path=path: reload_knowledge_base(path),
+                teardown=lambda: reload_knowledge_base(original),
+            ))
+
+    return benchmarks
+
+
+# --------------------------------------------------
+# Auth
+# --------------------------------------------------
+def auth_benchmarks(data: SeededData, client, concurrency: int) -> List[Benchmark]:
+    token = data.patient_token
+
+    async def current_user_cold():
+        principal_cache.clear()
+        await get_current_user(token)
+
+    login = {"email": "bench-patient@example.com", "password": PASSWORD}
+
+    async def login_request():
+        response = await client.post("/auth/login", json=login)
+        response.raise_for_status()
+
+    return [
+        Benchmark(
+            name="auth.jwt_decode",
+            fn=lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"]),
+        ),
+        Benchmark(
+            name="auth.get_current_user[cache=warm]",
+            fn=lambda: get_current_user(token),
+        ),
+        Benchmark(
+            name="auth.get_current_user[cache=cold]",
+            fn=current_user_cold,
+        ),
+        # bcrypt dominates: few iterations, run with the pool's parallelism
+        Benchmark(
+            name=f"api.auth.login[concurrency={concurrency}]",
+            fn=login_request,
+            concurrency=concurrency,
+            min_iterations=20,
+            warmup=2,
+        ),
+    ]
+
+
+# --------------------------------------------------
+# API reads
+# --------------------------------------------------
+def _get(client, url: str, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def request():
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+
+    return request
+
+
+def api_benchmarks(data: SeededData, client, concurrency: int, page_size: int) -> List[Benchmark]:
+    links = len(data.linked_patient_ids)
+    prescriptions_url = f"/prescriptions/patient/{data.patient_id}?limit={page_size}"
+    return [
+        Benchmark(
+            name=f"api.family.my_patients[links={links},concurrency={concurrency}]",
+            fn=_get(client, "/family/my-patients", data.family_token),
+            concurrency=concurrency,
+        ),
+        Benchmark(
+            name=f"api.prescriptions.patient[as=patient,limit={page_size},concurrency={concurrency}]",
+            fn=_get(client, prescriptions_url, data.patient_token),
+            concurrency=concurrency,
+        ),
+        Benchmark(
+            name=f"api.prescriptions.patient[as=family,limit={page_size},concurrency={concurrency}]",
+            fn=_get(client, prescriptions_url, data.family_token),
+            concurrency=concurrency,
+        ),
+    ]